@@ -0,0 +1,233 @@
+# benchmarks/run_benchmarks.py
+
+"""
+Times each stage of the dashboard on synthetic ledgers and writes the results as JSON.
+
+    python benchmarks/run_benchmarks.py --sizes 1k,100k --output benchmarks/results/main.json
+    python benchmarks/run_benchmarks.py --sizes 1k,100k --compare benchmarks/results/main.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+
+import budget_analysis
+import budget_data
+import budget_dataset
+import budget_variance
+from budget_charts import format_currency_millions, render_table_html, style_dataframe
+from synthetic_ledger import SIZES, generate_ledger, parse_size
+
+DATA_DIR = os.path.join(ROOT, 'benchmarks', 'data')
+
+
+def _timed(fn, repeat):
+    """
+    Runs fn() 'repeat' times; returns (last result, timing summary in seconds).
+    """
+    runs = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - start)
+    return result, {'min': min(runs), 'median': statistics.median(runs), 'runs': runs}
+
+
+def _ledger_path(label, rows, seed):
+    path = os.path.join(DATA_DIR, f"ledger_{label}_{seed}.csv")
+    if not os.path.exists(path):
+        print(f"  generando {rows:,} filas -> {path}")
+        generate_ledger(rows, path, seed=seed)
+    return path
+
+
+def bench_stages(file_path, repeat):
+    """
+    Times the data stages (load, Ceniflores split, aggregations, Pareto, table HTML).
+    """
+    results = {}
+    value = budget_data.BUDGET_COLUMN
+
+    _, results['load_data_csv'] = _timed(lambda: budget_data.load_budget(file_path, use_sidecar=False), repeat)
+    budget_data.load_budget(file_path)  # Escribe el sidecar para la medición siguiente
+    df, results['load_data_sidecar'] = _timed(lambda: budget_data.load_budget(file_path), repeat)
+    dataset, results['shared_dataset'] = _timed(lambda: budget_dataset.BudgetDataset(df), repeat)
+    results['shared_dataset'].update(dataset.memory_usage())
+
+    cube, results['aggregate_cube'] = _timed(lambda: budget_analysis.build_aggregate_cube(df), repeat)
+
+    def ceniflores_split():
+        total = cube.loc[budget_analysis.ceniflores_income_mask(cube), 'total'].sum()
+        return budget_analysis.cube_for_view(cube, "General"), total
+    (cube_main, _), results['ceniflores_split'] = _timed(ceniflores_split, repeat)
+
+    def kpis():
+        ingresos = budget_analysis.total_by_tipo(cube_main, 'Ingresos')
+        egresos = budget_analysis.total_by_tipo(cube_main, 'Egresos')
+        return ingresos - egresos
+    _, results['kpis'] = _timed(kpis, repeat)
+
+    blocks = {
+        'ingresos_por_rubro': lambda view: budget_analysis.breakdown_by_rubro(view, 'Ingresos', top_n=6),
+        'ingresos_por_area': lambda view: budget_analysis.breakdown_by_area(view, 'Ingresos', positive_rows_only=True),
+        'egresos_por_rubro': lambda view: budget_analysis.breakdown_by_rubro(view, 'Egresos', top_n=5),
+        'egresos_por_area': lambda view: budget_analysis.breakdown_by_area(view, 'Egresos'),
+    }
+    areas = sorted(df['Area'].unique().astype(str))
+    for name, block in blocks.items():
+        # Un bloque por cada vista: "General" + todas las áreas
+        views = [budget_analysis.cube_for_view(cube, area) for area in ["General"] + areas]
+        _, results[name] = _timed(lambda: [block(view) for view in views], repeat)
+
+    pareto_table, results['pareto_table'] = _timed(lambda: budget_analysis.build_pareto_table(df), repeat)
+    _, results['variance_report'] = _timed(lambda: budget_variance.build_variance_report(df), repeat)
+    frames = [df[df['Area'] == area] for area in areas]
+    _, results['perform_pareto_analysis'] = _timed(
+        lambda: [budget_analysis.perform_pareto_analysis(frame) for frame in frames], repeat)
+
+    # Tabla más grande que puede mostrar el dashboard: el Pareto del área con más CECOs
+    largest = max(areas, key=lambda area: len(budget_analysis.pareto_for_area(pareto_table, area)))
+    pareto_df = budget_analysis.pareto_for_area(pareto_table, largest)
+    pareto_df[value] = pareto_df[value].apply(format_currency_millions)
+    pareto_df = pareto_df.rename(columns={value: 'Monto (M)'})
+    _, results['style_dataframe_to_html'] = _timed(lambda: style_dataframe(pareto_df).to_html(), repeat)
+    results['style_dataframe_to_html']['rows'] = len(pareto_df)
+    _, results['render_table_html'] = _timed(lambda: render_table_html(pareto_df), repeat)
+    results['render_table_html']['rows'] = len(pareto_df)
+
+    return results, areas
+
+
+def _area_selector(at):
+    # None si la última ejecución fue solo del fragmento (el árbol no trae la barra lateral)
+    return next((widget for widget in at.selectbox if widget.key == 'selected_area'), None)
+
+
+def bench_app(file_path, areas, timeout):
+    """
+    Headless runs with Streamlit's AppTest: one cold run, then one area change per area
+    (the fragment-only rerun of the area detail, as in the browser).
+    """
+    from streamlit.testing.v1 import AppTest
+
+    os.environ['PRESUPUESTO_FILE'] = file_path
+    results = {}
+    at = AppTest.from_file(os.path.join(ROOT, 'dashboard.py'), default_timeout=timeout)
+    start = time.perf_counter()
+    at.run()
+    results['app_run_cold'] = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"El dashboard falló: {at.exception}")
+
+    per_area = {}
+    fragment_reruns = 0
+    for area in ["General"] + areas:
+        if _area_selector(at) is None:
+            # Tras una ejecución solo del fragmento el árbol no tiene la barra lateral:
+            # se reconstruye con una ejecución completa (sin medir) para poder cambiar de área
+            at.run()
+        start = time.perf_counter()
+        _area_selector(at).select(area).run()
+        per_area[area] = time.perf_counter() - start
+        if at.exception:
+            raise RuntimeError(f"El dashboard falló en '{area}': {at.exception}")
+        # El cambio de área vuelve a ejecutar solo el detalle (st.fragment): el árbol resultante no trae los KPIs
+        fragment_reruns += _area_selector(at) is None
+    results['app_run_per_area'] = per_area
+    results['app_run_area_median'] = statistics.median(per_area.values())
+    results['app_fragment_reruns'] = fragment_reruns
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, tolerance):
+    """
+    Lists the stages whose median got slower than 'tolerance' times the baseline.
+    """
+    regressions = []
+    for size, stages in current['results'].items():
+        base_stages = baseline.get('results', {}).get(size, {})
+        for stage, timing in stages.items():
+            base = base_stages.get(stage)
+            if not isinstance(timing, dict) or not isinstance(base, dict):
+                continue
+            ratio = timing['median'] / base['median'] if base['median'] else float('inf')
+            if ratio > tolerance:
+                regressions.append((size, stage, base['median'], timing['median'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del dashboard de presupuesto")
+    parser.add_argument('--sizes', default=','.join(SIZES), help="Tamaños separados por coma (1k,100k,1M,10M o números)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=2026)
+    parser.add_argument('--skip-app', action='store_true', help="No ejecutar el dashboard completo con AppTest")
+    parser.add_argument('--app-timeout', type=float, default=600)
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results', 'latest.json'))
+    parser.add_argument('--compare', help="JSON de una ejecución anterior para detectar regresiones")
+    parser.add_argument('--tolerance', type=float, default=1.25, help="Razón máxima aceptada frente a --compare")
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'results': {},
+    }
+
+    for label in args.sizes.split(','):
+        rows = parse_size(label)
+        print(f"[{label}] {rows:,} filas")
+        file_path = _ledger_path(label, rows, args.seed)
+        results, areas = bench_stages(file_path, args.repeat)
+        if not args.skip_app:
+            results.update(bench_app(file_path, areas, args.app_timeout))
+        results['rows'] = rows
+        report['results'][label] = results
+        for stage, timing in results.items():
+            if isinstance(timing, dict) and 'median' in timing:
+                print(f"  {stage:<28} {timing['median'] * 1000:10.1f} ms")
+            elif isinstance(timing, float):
+                print(f"  {stage:<28} {timing * 1000:10.1f} ms")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Resultados en {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for size, stage, before, after, ratio in regressions:
+            print(f"REGRESIÓN [{size}] {stage}: {before * 1000:.1f} ms -> {after * 1000:.1f} ms (x{ratio:.2f})")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
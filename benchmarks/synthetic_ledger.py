@@ -0,0 +1,122 @@
+# benchmarks/synthetic_ledger.py
+
+"""
+Generates synthetic budget CSVs with the same schema as presupuesto2025.csv
+(';' delimiter, UTF-8 with BOM, CRLF, Colombian number format).
+
+    python benchmarks/synthetic_ledger.py 100k benchmarks/data/ledger_100k.csv
+"""
+
+import argparse
+import csv
+import os
+
+import numpy as np
+import pandas as pd
+
+HEADER = [
+    'Nuevo Ceco', 'Ceco', 'Area', 'Rubro', 'Tipo', 'Nombre Ceco', ' Presupuesto 2025 ',
+    'Ejecutado a ago + extracontable', 'Presupuesto 2026',
+    '% Var Ejecución 2025 vs Ppto 2025', '$ Var Ejecución 2025 vs Ppto 20252',
+    '% Var Ejecución 2025 vs Ppto 2026', '$ Var Ejecución 2025 vs Ppto 20262',
+    ' Septiembre ', ' Octubre ', ' Noviembre ', ' Diciembre ', ' Total Extracontable ',
+    ' Ejecución a Ago 2025 ', ' Total ejecutado + extracontable ',
+]
+
+AREAS = [
+    'Investigación y Desarrollo Floral', 'Gestión de Cuotas y Afiliaciones',
+    'Administración y Finanzas', 'Marketing y Comunicaciones', 'Dirección Regional Antioquia',
+    'Sostenibilidad y Certificación FlorVerde', 'Planeación y Logística',
+    'Promoción y Eventos Comerciales', 'Desarrollo Sectorial y Políticas Públicas',
+    'Gestión Ambiental', 'Dirección General', 'Proflora – Coordinación General',
+    'Responsabilidad Social y Comunitaria', 'Gestión del Talento Humano', 'Vicepresidencia Ejecutiva',
+]
+EGRESO_RUBROS = ['Personal', 'Operación Sedes + Gestión Inst. Gremial', 'Plan Prog. Areas', 'Ferias y eventos', 'Proflora 2026 / 2027']
+INGRESO_RUBROS = ['Cuotas (Demás)', 'Cuotas Tope', 'Financieros', 'Plan Prog. Areas', 'Rendimientos', 'Excedentes Siflor 2026']
+
+SIZES = {'1k': 1_000, '100k': 100_000, '1M': 1_000_000, '10M': 10_000_000}
+CHUNK_ROWS = 500_000
+
+
+def parse_size(label):
+    """
+    '100k' -> 100000. Accepts the SIZES labels or a plain integer.
+    """
+    return SIZES[label] if label in SIZES else int(label)
+
+
+def format_cop(values):
+    """
+    Integer pesos in Colombian format ('1.234.567').
+    """
+    return pd.Series(values).map('{:,}'.format).str.replace(',', '.', regex=False)
+
+
+def _chunk(rng, start, rows):
+    is_ingreso = rng.random(rows) < 0.1
+    rubro = np.where(
+        is_ingreso,
+        rng.choice(INGRESO_RUBROS, rows),
+        rng.choice(EGRESO_RUBROS, rows),
+    )
+    # Montos log-normales: pocos CECOs grandes y muchos pequeños, como en el presupuesto real
+    budget = np.round(rng.lognormal(mean=16, sigma=1.6, size=rows), -3).astype('int64')
+    executed = (budget * rng.uniform(0.3, 1.1, rows)).astype('int64')
+    budget_2026 = (budget * rng.uniform(0.9, 1.2, rows)).astype('int64')
+    months = [(budget * rng.uniform(0, 0.1, rows)).astype('int64') for _ in range(4)]
+    ceco_ids = np.arange(start, start + rows)
+
+    # Como en el CSV real, una parte de los montos viene sin separador de miles
+    budget_text = format_cop(budget)
+    plain = rng.random(rows) < 0.2
+    budget_text[plain] = budget[plain].astype(str)
+
+    return pd.DataFrame({
+        HEADER[0]: '',
+        HEADER[1]: pd.Series(ceco_ids % 9000 + 1000).astype(str) + ' ' + pd.Series(ceco_ids % 1000).astype(str).str.zfill(3),
+        HEADER[2]: rng.choice(AREAS, rows),
+        HEADER[3]: rubro,
+        HEADER[4]: np.where(is_ingreso, 'Ingresos', 'Egresos'),
+        HEADER[5]: 'Ceco sintético ' + pd.Series(ceco_ids % 50_000).astype(str),
+        HEADER[6]: budget_text,
+        HEADER[7]: format_cop(executed),
+        HEADER[8]: format_cop(budget_2026),
+        HEADER[9]: '',
+        HEADER[10]: format_cop(executed - budget),
+        HEADER[11]: '',
+        HEADER[12]: format_cop(executed - budget_2026),
+        HEADER[13]: format_cop(months[0]),
+        HEADER[14]: format_cop(months[1]),
+        HEADER[15]: format_cop(months[2]),
+        HEADER[16]: format_cop(months[3]),
+        HEADER[17]: format_cop(sum(months)),
+        HEADER[18]: format_cop(executed),
+        HEADER[19]: format_cop(executed + sum(months)),
+    })
+
+
+def generate_ledger(rows, file_path, seed=2026):
+    """
+    Writes a synthetic ledger of 'rows' lines to 'file_path', in chunks so memory stays bounded.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8-sig', newline='') as f:
+        f.write(';'.join(HEADER) + '\r\n')
+        for start in range(0, rows, CHUNK_ROWS):
+            chunk = _chunk(rng, start, min(CHUNK_ROWS, rows - start))
+            chunk.to_csv(f, sep=';', header=False, index=False, lineterminator='\r\n', quoting=csv.QUOTE_MINIMAL)
+    return file_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un presupuesto sintético con el esquema de presupuesto2025.csv")
+    parser.add_argument('size', help="Número de filas o una etiqueta: " + ', '.join(SIZES))
+    parser.add_argument('output', help="Ruta del CSV a generar")
+    parser.add_argument('--seed', type=int, default=2026)
+    args = parser.parse_args()
+    generate_ledger(parse_size(args.size), args.output, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+# budget_analysis.py
+
+import pandas as pd
+
+from budget_data import BUDGET_COLUMN, SOURCE_COLUMN
+
+# --- Business Rules ---
+CENIFLORES_AREA = 'Investigación y Desarrollo Floral'
+CUBE_KEYS = ['Area', 'Tipo', 'Rubro']
+
+
+# --- Aggregate Cube ---
+def _cube_keys(frame):
+    # Con varios archivos, la fuente es una dimensión más del cubo
+    return CUBE_KEYS + [SOURCE_COLUMN] if SOURCE_COLUMN in frame.columns else CUBE_KEYS
+
+
+def build_aggregate_cube(df, value_column=BUDGET_COLUMN):
+    """
+    Builds the (Area, Tipo, Rubro) aggregate cube every view is sliced from
+    (plus the source when the frame combines several files).
+    'total' is the plain sum and 'positive' the sum of the rows with a positive amount.
+    """
+    keys = _cube_keys(df)
+    values = df[value_column]
+    cube = (
+        df[keys]
+        .assign(total=values, positive=values.where(values > 0, 0))
+        .groupby(keys, observed=True, sort=True)[['total', 'positive']]
+        .sum()
+        .reset_index()
+    )
+    return cube
+
+
+def merge_cubes(cubes):
+    """
+    Combines cubes built from disjoint row sets (e.g. the cube of appended rows)
+    into the cube of their union. Cubes are additive, so no row is re-read.
+    """
+    keys = _cube_keys(cubes[0])
+    combined = pd.concat([cube.astype({key: str for key in keys}) for cube in cubes], ignore_index=True)
+    return combined.groupby(keys, sort=True)[['total', 'positive']].sum().reset_index()
+
+
+def filter_sources(frame, sources):
+    """
+    Rows (or cube cells) of the selected sources. 'sources' None or empty keeps everything.
+    """
+    if not sources or SOURCE_COLUMN not in frame.columns:
+        return frame
+    return frame[frame[SOURCE_COLUMN].isin(sources)]
+
+
+def ceniflores_income_mask(cube):
+    return (cube['Area'] == CENIFLORES_AREA) & (cube['Tipo'] == 'Ingresos')
+
+
+def cube_for_view(cube, selected_area):
+    """
+    Slice of the cube behind a view. "General" excludes the Ceniflores income,
+    any other area keeps all of its rows (including Ceniflores' own income).
+    """
+    if selected_area == "General":
+        return cube[~ceniflores_income_mask(cube)]
+    return cube[cube['Area'] == selected_area]
+
+
+def total_by_tipo(cube_slice, tipo):
+    return cube_slice.loc[cube_slice['Tipo'] == tipo, 'total'].sum()
+
+
+def breakdown_by_rubro(cube_slice, tipo, top_n, value_column=BUDGET_COLUMN):
+    """
+    Top-N Rubros of a Tipo, same shape as groupby('Rubro').sum().nlargest(n).reset_index().
+    The amount column is named 'value_column'.
+    """
+    rows = cube_slice[cube_slice['Tipo'] == tipo]
+    by_rubro = rows.groupby('Rubro', observed=True)['total'].sum().nlargest(top_n)
+    return by_rubro.rename(value_column).reset_index()
+
+
+def breakdown_by_area(cube_slice, tipo, positive_rows_only=False, value_column=BUDGET_COLUMN):
+    """
+    Per-Area totals of a Tipo sorted ascending, keeping only areas with a positive total.
+    With positive_rows_only the negative rows are ignored before summing.
+    """
+    rows = cube_slice[cube_slice['Tipo'] == tipo]
+    measure = 'positive' if positive_rows_only else 'total'
+    by_area = rows.groupby('Area', observed=True)[measure].sum().sort_values(ascending=True)
+    by_area = by_area[by_area > 0]
+    return by_area.rename(value_column).reset_index()
+
+
+# --- Pareto Engine ---
+PARETO_THRESHOLDS = (0.50, 0.80, 0.95)
+DEFAULT_PARETO_THRESHOLD = 0.80
+
+
+def pareto_flag_column(threshold):
+    return f"Pareto {round(threshold * 100)}%"
+
+
+def build_pareto_table(df, thresholds=PARETO_THRESHOLDS, value_column=BUDGET_COLUMN):
+    """
+    Pareto analysis for every area in one pass: a single sort by (Area, amount desc)
+    plus a grouped cumsum. Only Egresos outside 'Personal' with a positive amount
+    are considered. For each threshold a boolean column marks the CECOs that make
+    up that share of their area's budget (up to and including the one that reaches it).
+    The result is indexed by Area (sorted), so each area is a cheap .loc lookup.
+    """
+    analysis_df = df.loc[
+        (df['Rubro'] != 'Personal') &
+        (df['Tipo'] != 'Ingresos') &
+        (df[value_column] > 0),
+        ['Area', 'Nombre Ceco', value_column]
+    ]
+    analysis_df = analysis_df.sort_values(
+        by=['Area', value_column], ascending=[True, False], kind='stable'
+    ).reset_index(drop=True)
+
+    by_area = analysis_df.groupby('Area', observed=True, sort=False)[value_column]
+    cumulative = by_area.cumsum()
+    area_total = by_area.transform('sum')
+    # Suma acumulada ANTES de cada fila: la fila entra si el área aún no alcanzaba el umbral
+    cumulative_before = cumulative - analysis_df[value_column]
+
+    analysis_df['Cumulative Share'] = cumulative / area_total
+    for threshold in thresholds:
+        analysis_df[pareto_flag_column(threshold)] = cumulative_before < area_total * threshold
+
+    return analysis_df.set_index('Area')
+
+
+def pareto_for_area(pareto_table, area, threshold=DEFAULT_PARETO_THRESHOLD, value_column=BUDGET_COLUMN):
+    """
+    The Pareto CECOs of one area, as ['Nombre Ceco', value_column].
+    """
+    if area not in pareto_table.index:
+        return pd.DataFrame(columns=['Nombre Ceco', value_column])
+    rows = pareto_table.loc[[area]]
+    return rows.loc[rows[pareto_flag_column(threshold)], ['Nombre Ceco', value_column]].reset_index(drop=True)
+
+
+def pareto_all_areas(pareto_table, threshold=DEFAULT_PARETO_THRESHOLD, value_column=BUDGET_COLUMN):
+    """
+    Organization-wide table of every area's Pareto CECOs, as ['Area', 'Nombre Ceco', value_column].
+    """
+    rows = pareto_table[pareto_table[pareto_flag_column(threshold)]]
+    return rows[['Nombre Ceco', value_column]].reset_index()
+
+
+def perform_pareto_analysis(data_df, threshold=DEFAULT_PARETO_THRESHOLD):
+    """
+    Performs a Pareto (80/20) analysis to find the top items
+    that constitute 80% (or 'threshold') of the total budget of a single frame.
+    """
+    table = build_pareto_table(data_df.assign(Area='_'), thresholds=(threshold,))
+    return pareto_for_area(table, '_', threshold)
+
+
+# --- Drill-down Index ---
+DRILLDOWN_LEVELS = ['Area', 'Rubro', 'Nombre Ceco']
+
+
+class DrilldownIndex:
+    """
+    Pre-aggregated sums of a Tipo by Area → Rubro → Nombre Ceco, one sorted Series
+    per level. The children of a node are a binary-search slice of the next level,
+    so expanding a node never touches the rows of the ledger or the other nodes.
+    """
+    def __init__(self, df, value_column=BUDGET_COLUMN):
+        self.value_column = value_column
+        keys = ['Tipo'] + DRILLDOWN_LEVELS
+        leaves = df.groupby(keys, observed=True, sort=True)[value_column].sum()
+        leaves.index = leaves.index.set_levels([level.astype(str) for level in leaves.index.levels])
+        leaves = leaves.sort_index()
+        # levels[d]: sumas por (Tipo, primeros d+1 niveles)
+        self.levels = [leaves.groupby(level=list(range(depth + 2)), sort=True).sum() for depth in range(len(DRILLDOWN_LEVELS) - 1)]
+        self.levels.append(leaves)
+
+    def children(self, tipo, path=(), exclude_ceniflores_income=False):
+        """
+        Children of the node 'path' (e.g. () for the areas, (area,) for its Rubros,
+        (area, rubro) for its CECOs) as [level, value_column], largest first.
+        With exclude_ceniflores_income the root follows the "General" view rule.
+        """
+        level_name = DRILLDOWN_LEVELS[len(path)]
+        table = self.levels[len(path)]
+        try:
+            node = table.loc[(tipo, *path)]
+        except KeyError:
+            return pd.DataFrame(columns=[level_name, self.value_column])
+        if not path and exclude_ceniflores_income and tipo == 'Ingresos':
+            node = node.drop(CENIFLORES_AREA, errors='ignore')
+        node = node.sort_values(ascending=False, kind='stable')
+        return pd.DataFrame({level_name: node.index.astype(str), self.value_column: node.to_numpy()})
+
+
+# --- Payroll Index ---
+PAYROLL_RUBRO = 'Personal'
+
+
+def personal_budget_by_area(cube_slice):
+    """
+    Egresos of the 'Personal' Rubro per Area (a Series indexed by Area name).
+    """
+    rows = cube_slice[(cube_slice['Tipo'] == 'Egresos') & (cube_slice['Rubro'] == PAYROLL_RUBRO)]
+    by_area = rows.groupby('Area', observed=True)['total'].sum()
+    by_area.index = by_area.index.astype(str)
+    return by_area
+
+
+class PayrollIndex:
+    """
+    Salaries (salarios.csv) pre-aggregated once per file version: totals and
+    headcount per Area, and the employees sorted by salary and indexed by Area,
+    so an area view is a .loc lookup instead of a scan of the salary table.
+    """
+    def __init__(self, salaries):
+        employees = salaries[['Area', 'Nombre', 'Cargo', 'Salario']].astype({'Area': str})
+        employees = employees.sort_values(by=['Area', 'Salario'], ascending=[True, False], kind='stable')
+        self.employees = employees.set_index('Area')
+        self.totals = employees.groupby('Area', sort=True)['Salario'].agg(['sum', 'size']).rename(
+            columns={'sum': 'Nómina', 'size': 'Personas'})
+
+    def area_employees(self, area):
+        """
+        Employees of one area as ['Nombre', 'Cargo', 'Salario'], highest salary first.
+        """
+        if area not in self.employees.index:
+            return pd.DataFrame(columns=['Nombre', 'Cargo', 'Salario'])
+        return self.employees.loc[[area]].reset_index(drop=True)
+
+    def area_total(self, area):
+        """
+        (payroll, headcount) of one area; (0, 0) if it has no employees.
+        """
+        if area not in self.totals.index:
+            return 0, 0
+        row = self.totals.loc[area]
+        return row['Nómina'], int(row['Personas'])
+
+    def compare_with_budget(self, personal_budget):
+        """
+        Per-area payroll next to the 'Personal' budget (see personal_budget_by_area),
+        as ['Area', 'Presupuesto Personal', 'Nómina', 'Personas']. Areas present on
+        only one side show 0 on the other.
+        """
+        table = self.totals.join(personal_budget.rename('Presupuesto Personal'), how='outer').fillna(0)
+        table = table.astype({'Personas': int}).rename_axis('Area').reset_index()
+        return table[['Area', 'Presupuesto Personal', 'Nómina', 'Personas']]
@@ -0,0 +1,218 @@
+# budget_charts.py
+
+import html
+import json
+import numbers
+import textwrap
+import threading
+from collections import OrderedDict
+
+import plotly.express as px
+
+from budget_data import BUDGET_COLUMN
+
+GREEN_COLOR_SCALE = px.colors.sequential.YlGnBu
+
+# --- Table Theme ---
+# Misma paleta verde de style_dataframe, pero en una hoja de estilos compartida:
+# cada tabla solo lleva class="budget-table" en lugar de estilos por celda.
+TABLE_CLASS = 'budget-table'
+TABLE_CSS = f"""
+table.{TABLE_CLASS} {{ border-collapse: collapse; }}
+table.{TABLE_CLASS} th, table.{TABLE_CLASS} td {{
+    color: black !important;
+    font-size: clamp(0.8rem, 2vw, 1rem) !important;
+    white-space: normal;
+}}
+table.{TABLE_CLASS} th {{ font-weight: bold; text-align: center; background-color: #a4c7b1 !important; }}
+table.{TABLE_CLASS} td {{ text-align: left; background-color: #b5dbc3 !important; }}
+table.{TABLE_CLASS} tbody tr:nth-child(even) td {{ background-color: #cce3d5 !important; }}
+"""
+
+
+# --- Helper Functions ---
+def format_currency_millions(value):
+    if not isinstance(value, numbers.Number) or value == 0:
+        return "$0"
+    value_in_millions = round(value / 1_000_000)
+    formatted_string = f"${value_in_millions:,.0f}".replace(',', '.')
+    return formatted_string
+
+def format_currency(value):
+    if not isinstance(value, numbers.Number) or value != value:
+        return "$0"
+    return f"${value:,.0f}".replace(',', '.')
+
+def format_percent(value):
+    if not isinstance(value, numbers.Number) or value != value:
+        return "—"
+    return f"{value:.1%}".replace('.', ',')
+
+def wrap_labels(label, length=25):
+    wrapped_text = textwrap.wrap(label, length, break_long_words=False)
+    return '<br>'.join(wrapped_text)
+
+def style_dataframe(df, currency_column=None):
+    """
+    Applies custom styling to any DataFrame for display in Streamlit.
+    """
+    # --- MODIFICACIÓN RESPONSIVA ---
+    # Usamos clamp() para el tamaño de fuente de la tabla
+    font_size_responsive = "clamp(0.8rem, 2vw, 1rem)"
+    
+    styler = df.style.set_properties(**{
+        'background-color': '#b5dbc3', 'color': 'black',
+        'font-size': font_size_responsive, # <-- Aplicado aquí
+        'text-align': 'left', 'white-space': 'normal'
+    }).set_table_styles([
+        {'selector': 'th', 'props': [
+            ('font-weight', 'bold'), ('text-align', 'center'),
+            ('background-color', '#a4c7b1'), ('color', 'black'),
+            ('font-size', font_size_responsive) # <-- Y aplicado aquí
+        ]},
+        {'selector': 'tbody tr:nth-child(even)', 'props': [('background-color', '#cce3d5')]}
+    ]).hide(axis="index")
+    
+    if currency_column and currency_column in df.columns:
+        styler = styler.format({currency_column: '${:,.0f}'})
+        
+    return styler
+
+
+def render_table_html(df, formatters=None):
+    """
+    Plain HTML table with the shared TABLE_CLASS theme (see TABLE_CSS), without the
+    index. 'formatters' maps column -> function applied to each value; the rest are
+    shown with str(). Much lighter than Styler.to_html(): no per-cell CSS or ids.
+    """
+    formatters = formatters or {}
+    header = ''.join(f"<th>{html.escape(str(col))}</th>" for col in df.columns)
+    cells = [
+        [html.escape(str(value)) for value in (map(formatters[col], df[col]) if col in formatters else df[col])]
+        for col in df.columns
+    ]
+    body = ''.join('<tr>' + ''.join(f"<td>{value}</td>" for value in row) + '</tr>' for row in zip(*cells))
+    return f'<table class="{TABLE_CLASS}"><thead><tr>{header}</tr></thead><tbody>{body}</tbody></table>'
+
+
+# --- Figure Builders ---
+def build_rubro_pie(por_rubro, value_column=BUDGET_COLUMN):
+    """
+    Donut chart of a Rubro breakdown (columns 'Rubro' and 'value_column').
+    """
+    por_rubro = por_rubro.assign(Rubro_wrapped=por_rubro['Rubro'].astype(str).apply(wrap_labels))
+    fig = px.pie(por_rubro, names='Rubro_wrapped', values=value_column, hole=0.5, color_discrete_sequence=GREEN_COLOR_SCALE)
+
+    fig.update_traces(textposition='outside', textinfo='percent+label', textfont=dict(color='white'))
+
+    fig.update_layout(
+        margin=dict(t=80, b=80, l=40, r=40),
+        showlegend=False,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
+
+def _horizontal_bar(frame, label_column, margin_bottom=0, value_column=BUDGET_COLUMN):
+    frame = frame.assign(
+        **{label_column: frame[label_column].astype(str)},
+        Ppto_millones=frame[value_column] / 1_000_000,
+        Ppto_millones_str=frame[value_column].apply(format_currency_millions),
+    )
+    max_value = frame['Ppto_millones'].max()
+    chart_height = len(frame) * 35 + 60
+    fig = px.bar(frame, x='Ppto_millones', y=label_column, text='Ppto_millones_str', orientation='h', color_discrete_sequence=GREEN_COLOR_SCALE)
+
+    fig.update_traces(texttemplate='%{text}', textposition='outside', textfont=dict(color='white'))
+
+    fig.update_layout(
+        xaxis=dict(showticklabels=False, showgrid=False, range=[0, max_value * 1.25]),
+        xaxis_title=dict(text=None, font=dict(color='white')),
+        yaxis_title=None, height=chart_height,
+        margin=dict(t=25, b=margin_bottom, r=60),
+        yaxis=dict(tickfont=dict(color='white'), automargin=True),
+        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+    return fig
+
+def build_area_bar(por_area, margin_bottom=0, value_column=BUDGET_COLUMN):
+    """
+    Horizontal bar chart of a per-Area breakdown (columns 'Area' and 'value_column').
+    """
+    return _horizontal_bar(por_area, 'Area', margin_bottom=margin_bottom, value_column=value_column)
+
+def build_children_bar(children, label_column, value_column=BUDGET_COLUMN):
+    """
+    Horizontal bar chart of the children of a drill-down node, largest on top
+    ('children' is sorted largest first, as returned by DrilldownIndex.children).
+    """
+    return _horizontal_bar(children.iloc[::-1], label_column, value_column=value_column)
+
+
+# --- Figure Cache ---
+class FigureCache:
+    """
+    Bounded LRU cache of serialized Plotly figure specs, shared by every session.
+    Entries are keyed by (selected_area, chart kind, data version) and the cache
+    holds at most 'max_bytes' of JSON. Loading a new dataset version clears it.
+    """
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._data_version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _clear(self):
+        self.evictions += len(self._entries)
+        self._entries.clear()
+        self._bytes = 0
+
+    def get_or_build(self, selected_area, kind, data_version, builder):
+        """
+        Returns the figure spec (a plain dict, ready for st.plotly_chart), building
+        it with 'builder()' on a miss.
+        """
+        key = (selected_area, kind, data_version)
+        with self._lock:
+            if data_version != self._data_version:
+                self._clear()
+                self._data_version = data_version
+            spec = self._entries.get(key)
+            if spec is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(spec)
+            self.misses += 1
+
+        # La construcción se hace fuera del lock para no bloquear otras sesiones
+        spec = builder().to_json()
+
+        with self._lock:
+            if data_version == self._data_version and key not in self._entries and len(spec) <= self.max_bytes:
+                self._entries[key] = spec
+                self._bytes += len(spec)
+                while self._bytes > self.max_bytes:
+                    _, old_spec = self._entries.popitem(last=False)
+                    self._bytes -= len(old_spec)
+                    self.evictions += 1
+        return json.loads(spec)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
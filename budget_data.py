@@ -0,0 +1,695 @@
+# budget_data.py
+
+import csv
+import glob
+import hashlib
+import io
+import os
+import re
+import shutil
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: sin él se usa el motor 'c' y no hay sidecar
+    pa = None
+    pa_csv = None
+    pq = None
+
+# --- Schema ---
+REQUIRED_COLUMNS = ['Tipo', 'Rubro', 'Area', 'Presupuesto 2025', 'Nombre Ceco']
+TEXT_COLUMNS = ['Tipo', 'Rubro', 'Area', 'Nombre Ceco']
+BUDGET_COLUMN = 'Presupuesto 2025'
+
+# Columnas de dinero (pesos enteros) que se cargan si existen en el CSV
+MONEY_COLUMNS = [
+    'Presupuesto 2025',
+    'Ejecutado a ago + extracontable',
+    'Presupuesto 2026',
+    '$ Var Ejecución 2025 vs Ppto 20252',
+    '$ Var Ejecución 2025 vs Ppto 20262',
+    'Septiembre',
+    'Octubre',
+    'Noviembre',
+    'Diciembre',
+    'Total Extracontable',
+    'Ejecución a Ago 2025',
+    'Total ejecutado + extracontable',
+]
+PERCENT_COLUMNS = [
+    '% Var Ejecución 2025 vs Ppto 2025',
+    '% Var Ejecución 2025 vs Ppto 2026',
+]
+OPTIONAL_COLUMNS = [col for col in MONEY_COLUMNS + PERCENT_COLUMNS if col not in REQUIRED_COLUMNS]
+
+# Se incrementa cuando cambia el esquema del frame limpio, para invalidar sidecars viejos
+SCHEMA_VERSION = '2'
+
+# Columna que identifica el archivo de origen cuando se carga una carpeta de presupuestos
+SOURCE_COLUMN = 'Fuente'
+
+CSV_DELIMITER = ';'
+SIDECAR_DIR = '.cache'
+
+# --- Ingest Modes ---
+# 'full' (por defecto): el CSV se parsea de una vez. 'stream': se lee por bloques de
+# INGEST_CHUNK_ROWS filas que se limpian y se escriben al sidecar uno a uno, y las
+# líneas rechazadas quedan en un archivo de cuarentena con su número de línea.
+INGEST_ENV_VAR = 'PRESUPUESTO_INGEST'
+INGEST_MODES = ('full', 'stream')
+INGEST_CHUNK_ROWS = 100_000
+
+
+class MissingColumnsError(ValueError):
+    """
+    Raised when the budget CSV does not contain every column in REQUIRED_COLUMNS.
+    """
+    def __init__(self, missing, found):
+        self.missing = list(missing)
+        self.found = list(found)
+        super().__init__(f"Faltan las siguientes columnas requeridas: {', '.join(self.missing)}")
+
+
+# --- Source Fingerprint ---
+def file_hash(file_path, chunk_size=1 << 20, limit=None):
+    """
+    Content hash of the file, or of its first 'limit' bytes.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    remaining = limit
+    with open(file_path, "rb") as f:
+        while remaining is None or remaining > 0:
+            chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def count_lines(file_path, chunk_size=1 << 20, limit=None):
+    """
+    Number of newlines in the file, or in its first 'limit' bytes.
+    """
+    lines = 0
+    remaining = limit
+    with open(file_path, "rb") as f:
+        while remaining is None or remaining > 0:
+            chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            lines += chunk.count(b"\n")
+            if remaining is not None:
+                remaining -= len(chunk)
+    return lines
+
+
+def file_fingerprint(file_path):
+    """
+    Returns the (size, mtime_ns, content hash) triple that identifies a version of the source file.
+    """
+    stat = os.stat(file_path)
+    return {
+        'size': str(stat.st_size),
+        'mtime_ns': str(stat.st_mtime_ns),
+        'hash': file_hash(file_path),
+    }
+
+
+def dataset_version(file_path):
+    """
+    Cheap version key (size + mtime) used to key derived caches on a dataset version.
+    For a folder it combines the versions of every budget file in it.
+    Returns None if the file (or every file of the folder) does not exist.
+    """
+    if os.path.isdir(file_path):
+        parts = [f"{os.path.basename(path)}:{dataset_version(path)}" for path in list_budget_files(file_path)]
+        if not parts:
+            return None
+        return hashlib.blake2b('|'.join(parts).encode(), digest_size=8).hexdigest()
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def sidecar_path(file_path, sidecar_dir=None):
+    """
+    Location of the typed Parquet sidecar for a given CSV.
+    """
+    base_dir = os.path.dirname(os.path.abspath(file_path))
+    cache_dir = os.path.join(base_dir, sidecar_dir or SIDECAR_DIR)
+    return os.path.join(cache_dir, os.path.basename(file_path) + ".parquet")
+
+
+def _sidecar_is_fresh(path, file_path):
+    """
+    A sidecar is fresh if its stored size and mtime match the source. When only the
+    mtime changed (e.g. the file was copied or touched) the content hash decides.
+    """
+    if pq is None or not os.path.exists(path):
+        return False
+    try:
+        meta = pq.read_schema(path).metadata or {}
+    except Exception:
+        return False
+    meta = {k.decode(): v.decode() for k, v in meta.items()}
+    stat = os.stat(file_path)
+    if meta.get('schema') != SCHEMA_VERSION or meta.get('size') != str(stat.st_size):
+        return False
+    if meta.get('mtime_ns') == str(stat.st_mtime_ns):
+        return True
+    return meta.get('hash') == file_hash(file_path)
+
+
+def _write_sidecar(df, path, file_path, report=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata.update({k.encode(): v.encode() for k, v in file_fingerprint(file_path).items()})
+    metadata[b'schema'] = SCHEMA_VERSION.encode()
+    if report is not None:
+        # Mismas claves que escribe load_budget_streaming, para que el modo 'stream' reutilice el sidecar
+        metadata[b'skipped_rows'] = str(report['skipped_rows']).encode()
+        metadata[b'quarantine_file'] = (report['quarantine_file'] or '').encode()
+    # Se escribe a un temporal y se renombra para que otro proceso nunca lea un archivo a medias
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _read_sidecar(path):
+    return pq.read_table(path, memory_map=True).to_pandas()
+
+
+def _sidecar_metadata(path):
+    # Metadatos del pie del archivo: incluyen los que se agregan al cerrar el writer
+    return {k.decode(): v.decode() for k, v in (pq.read_metadata(path).metadata or {}).items()}
+
+
+def save_sidecar(df, file_path, report=None):
+    """
+    Writes the sidecar for an already-cleaned frame (e.g. after an incremental append),
+    with the ingest report of a streaming load if given.
+    Does nothing without pyarrow or when the folder is read-only.
+    """
+    if pq is None:
+        return
+    try:
+        _write_sidecar(df, sidecar_path(file_path), file_path, report)
+    except OSError:
+        pass
+
+
+# --- CSV Parsing ---
+def _csv_engine():
+    return 'pyarrow' if pa is not None else 'c'
+
+
+def _resolve_columns(file_path):
+    """
+    Reads only the header and returns (clean column names, raw names to read).
+    Raises MissingColumnsError if a required column is missing.
+    """
+    header = pd.read_csv(file_path, delimiter=CSV_DELIMITER, nrows=0).columns
+    if hasattr(file_path, 'seek'):
+        file_path.seek(0)
+    raw_names = {name.strip(): name for name in header}
+
+    missing_cols = [col for col in REQUIRED_COLUMNS if col not in raw_names]
+    if missing_cols:
+        raise MissingColumnsError(missing_cols, [name.strip() for name in header])
+
+    columns = REQUIRED_COLUMNS + [col for col in OPTIONAL_COLUMNS if col in raw_names]
+    return columns, [raw_names[col] for col in columns]
+
+
+def budget_columns(file_paths):
+    """
+    Clean column names shared by several CSVs: REQUIRED_COLUMNS plus every optional
+    column found in at least one header, in schema order. Reads only the headers.
+    """
+    found = set()
+    for file_path in file_paths:
+        found.update(_resolve_columns(file_path)[0])
+    return REQUIRED_COLUMNS + [col for col in OPTIONAL_COLUMNS if col in found]
+
+
+def read_budget_csv(file_path, engine=None):
+    """
+    Parses the budget CSV with the C or pyarrow engine, reading the required columns
+    and whichever optional money/percent columns exist, all as strings.
+    Raises MissingColumnsError before parsing the body.
+    """
+    columns, usecols = _resolve_columns(file_path)
+    df = pd.read_csv(
+        file_path,
+        delimiter=CSV_DELIMITER,
+        engine=engine or _csv_engine(),
+        usecols=usecols,
+        dtype={name: str for name in usecols},
+        on_bad_lines='skip',
+    )
+    df.columns = df.columns.str.strip()
+    return df[columns]
+
+
+def iter_budget_chunks(file_path, chunksize=100_000, quarantine=None):
+    """
+    Yields cleaned frames of at most 'chunksize' rows, so parsing holds one chunk
+    of strings at a time whatever the file size. Malformed lines are skipped; with a
+    BadLineQuarantine they are also recorded there with their line number.
+    """
+    columns, usecols = _resolve_columns(file_path)
+    if quarantine is not None and pa_csv is not None:
+        raw_chunks = _iter_arrow_chunks(file_path, usecols, chunksize, quarantine)
+    else:
+        raw_chunks = _iter_c_chunks(file_path, usecols, chunksize, quarantine)
+    for chunk in raw_chunks:
+        chunk.columns = chunk.columns.str.strip()
+        yield clean_budget_frame(chunk[columns])
+
+
+def _iter_c_chunks(file_path, usecols, chunksize, quarantine):
+    """
+    Raw string chunks from the C engine. Its only report of a bad line is a
+    ParserWarning with the line number; the text is read back afterwards. It only
+    rejects lines with too many fields (short lines are padded with NaN), and only
+    when every column is read, so with a quarantine usecols is not applied.
+    """
+    reader = pd.read_csv(
+        file_path,
+        delimiter=CSV_DELIMITER,
+        engine='c',
+        usecols=usecols if quarantine is None else None,
+        dtype=str,
+        on_bad_lines='skip' if quarantine is None else 'warn',
+        chunksize=chunksize,
+    )
+    rejected = {}
+    with reader:
+        while True:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always', pd.errors.ParserWarning)
+                chunk = next(reader, None)
+            for warning in caught:
+                for number, reason in _BAD_LINE_WARNING.findall(str(warning.message)):
+                    rejected[int(number)] = reason
+            if chunk is None:
+                break
+            yield chunk
+    if rejected:
+        _quarantine_lines(file_path, rejected, quarantine)
+
+
+_BAD_LINE_WARNING = re.compile(r'Skipping line (\d+): (.*)')
+
+
+def _open_text(file_path):
+    if hasattr(file_path, 'seek'):
+        # Búfer en memoria (p. ej. las filas agregadas al CSV), ya completo en memoria
+        file_path.seek(0)
+        return io.StringIO(file_path.read().decode('utf-8', errors='replace'))
+    return open(file_path, encoding='utf-8', errors='replace')
+
+
+def _quarantine_lines(file_path, rejected, quarantine):
+    # Segunda pasada, línea a línea, solo para recuperar el texto de las líneas rechazadas
+    with _open_text(file_path) as f:
+        for number, line in enumerate(f, start=1):
+            if number in rejected:
+                quarantine.add(number, rejected.pop(number), line.rstrip('\r\n'))
+                if not rejected:
+                    break
+    for number, reason in sorted(rejected.items()):
+        quarantine.add(number, reason, '')
+
+
+def _iter_arrow_chunks(file_path, usecols, chunksize, quarantine):
+    """
+    Raw string chunks from pyarrow's streaming CSV reader, which hands every invalid
+    row (with its line number and text) to the quarantine.
+    """
+    def reject(row):
+        quarantine.add(row.number, f"expected {row.expected_columns} fields, saw {row.actual_columns}", row.text)
+        return 'skip'
+
+    reader = pa_csv.open_csv(
+        file_path,
+        parse_options=pa_csv.ParseOptions(delimiter=CSV_DELIMITER, newlines_in_values=True, invalid_row_handler=reject),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=usecols, column_types={name: pa.string() for name in usecols}, strings_can_be_null=True),
+    )
+    batches, rows = [], 0
+    for batch in reader:
+        batches.append(batch)
+        rows += batch.num_rows
+        while rows >= chunksize:
+            # Los lotes de pyarrow no coinciden con chunksize: se corta y el resto pasa al siguiente bloque
+            table = pa.Table.from_batches(batches)
+            yield table.slice(0, chunksize).to_pandas()
+            rest = table.slice(chunksize)
+            batches, rows = rest.to_batches(), rest.num_rows
+    if rows:
+        yield pa.Table.from_batches(batches).to_pandas()
+
+
+# --- Bad-line Quarantine ---
+def quarantine_path(file_path, sidecar_dir=None):
+    """
+    Location of the quarantine file (rejected lines) of a CSV, next to its sidecar.
+    """
+    return sidecar_path(file_path, sidecar_dir)[:-len(".parquet")] + ".rejected.csv"
+
+
+class BadLineQuarantine:
+    """
+    Writes the lines the parser rejects to a ';' CSV (Linea, Motivo, Texto) as they
+    are found, so only the count is kept in memory. The file is swapped in on close;
+    when no line was rejected a stale quarantine file is removed instead.
+
+    With append=True (rows appended to an already loaded CSV) the new lines are added
+    to the existing file and nothing is removed; line_offset turns the line numbers
+    of the parsed tail into line numbers of the whole CSV.
+    """
+    def __init__(self, path, line_offset=0, append=False):
+        self.path = path
+        self.line_offset = line_offset
+        self.append = append
+        self.count = 0
+        self._tmp_path = f"{path}.{os.getpid()}.tmp"
+        self._file = None
+        self._writer = None
+
+    def add(self, line_number, reason, text):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self._tmp_path, 'w', encoding='utf-8', newline='')
+            self._writer = csv.writer(self._file, delimiter=CSV_DELIMITER)
+            self._writer.writerow(['Linea', 'Motivo', 'Texto'])
+        self._writer.writerow([line_number + self.line_offset, reason, text])
+        self.count += 1
+
+    def close(self):
+        """
+        Returns the quarantine file path, or None if no line was rejected.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            if self.append and os.path.exists(self.path):
+                with open(self._tmp_path, encoding='utf-8', newline='') as src, \
+                        open(self.path, 'a', encoding='utf-8', newline='') as dst:
+                    next(src)  # Encabezado
+                    shutil.copyfileobj(src, dst)
+                os.remove(self._tmp_path)
+            else:
+                os.replace(self._tmp_path, self.path)
+            return self.path
+        if self.append:
+            return self.path if os.path.exists(self.path) else None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        return None
+
+    def discard(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.remove(self._tmp_path)
+
+
+# --- Cleaning ---
+def _normalize_number_strings(values):
+    """
+    Colombian number format to a parseable string: '$ 1.234.567,89' -> '1234567.89'.
+    Accounting negatives '(1.234)' become '-1234'.
+    """
+    text = values.astype(str).str.strip()
+    negative = text.str.startswith('(') & text.str.endswith(')')
+    text = text.str.replace(r'[$.()%\s]', '', regex=True).str.replace(',', '.', regex=False)
+    return text.where(~negative, '-' + text)
+
+
+def parse_cop(values):
+    """
+    Vectorized parser of Colombian peso amounts (thousands '.', decimals ',') into
+    int64 pesos. Empty or unparseable values become 0.
+    """
+    amounts = pd.to_numeric(_normalize_number_strings(values), errors='coerce')
+    return amounts.fillna(0).round().astype('int64')
+
+
+def parse_percent(values):
+    """
+    Parses Colombian-format percentages ('12,5%') into float32; unparseable values are NaN.
+    """
+    return pd.to_numeric(_normalize_number_strings(values), errors='coerce').astype('float32')
+
+
+def clean_budget_frame(df):
+    """
+    Cleans a raw budget frame: money columns to int64 pesos, percent columns to
+    float32 and text columns to categoricals.
+    """
+    # Limpieza de columnas de dinero y porcentaje
+    for col in MONEY_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_cop(df[col])
+    for col in PERCENT_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_percent(df[col])
+
+    # Limpieza de columnas de texto (categóricas: cada valor se guarda una sola vez)
+    for col in TEXT_COLUMNS:
+        df[col] = df[col].fillna('N/A').str.strip().astype('category')
+
+    return df
+
+
+def concat_budget_frames(frames):
+    """
+    Concatenates cleaned frames keeping the text columns categorical
+    (plain pd.concat falls back to object when the categories differ).
+    """
+    frames = [frame for frame in frames if frame is not None]
+    text_values = {
+        col: union_categoricals([frame[col] for frame in frames], ignore_order=True)
+        for col in TEXT_COLUMNS
+    }
+    df = pd.concat([frame.drop(columns=TEXT_COLUMNS) for frame in frames], ignore_index=True)
+    for col in TEXT_COLUMNS:
+        df[col] = pd.Categorical(text_values[col])
+    # Se conserva el orden de columnas del primer frame
+    return df[list(frames[0].columns)]
+
+
+def money_columns(df):
+    """
+    Money columns present in a cleaned frame, in MONEY_COLUMNS order.
+    """
+    return [col for col in MONEY_COLUMNS if col in df.columns]
+
+
+def load_budget(file_path, use_sidecar=True, engine=None):
+    """
+    Loads the cleaned budget frame. When pyarrow is available the cleaned result is
+    cached in a Parquet sidecar keyed on the source size, mtime and hash, so later
+    starts memory-map the sidecar and skip CSV parsing entirely.
+    """
+    path = sidecar_path(file_path)
+    if use_sidecar and _sidecar_is_fresh(path, file_path):
+        try:
+            return _read_sidecar(path)
+        except Exception:
+            pass  # Un sidecar corrupto se regenera a partir del CSV
+
+    df = clean_budget_frame(read_budget_csv(file_path, engine=engine))
+
+    if use_sidecar and pq is not None:
+        try:
+            _write_sidecar(df, path, file_path)
+        except OSError:
+            pass  # Directorio de solo lectura: se sigue sin sidecar
+    return df
+
+
+# --- Streaming Ingest ---
+def selected_ingest_mode():
+    mode = os.environ.get(INGEST_ENV_VAR, 'full').lower()
+    return mode if mode in INGEST_MODES else 'full'
+
+
+def _arrow_chunk(df, schema=None, metadata=None):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if schema is None:
+        # Las categorías de cada bloque son distintas: todos se escriben como dictionary<int32, string>
+        schema = pa.schema([
+            field.with_type(pa.dictionary(pa.int32(), pa.string())) if pa.types.is_dictionary(field.type) else field
+            for field in table.schema
+        ], metadata={**(table.schema.metadata or {}), **(metadata or {})})
+    return table.cast(schema), schema
+
+
+def _empty_budget_frame(file_path):
+    columns, _ = _resolve_columns(file_path)
+    return clean_budget_frame(pd.DataFrame({col: pd.Series(dtype=object) for col in columns}))
+
+
+def _sort_categories(df):
+    # Mismo orden de categorías que astype('category') sobre el archivo completo
+    for col in TEXT_COLUMNS:
+        df[col] = df[col].cat.set_categories(sorted(df[col].cat.categories))
+    return df
+
+
+def load_budget_streaming(file_path, chunksize=INGEST_CHUNK_ROWS, on_chunk=None):
+    """
+    Streaming ingest: the CSV is read in chunks of 'chunksize' rows; each chunk is
+    cleaned, passed to 'on_chunk' (e.g. to fold it into running aggregates) and
+    appended to the typed Parquet sidecar, then dropped. Rejected lines go to the
+    quarantine file (see quarantine_path) with their line number, so parsing never
+    holds more than one chunk of strings. The frame is then memory-mapped from the
+    sidecar. Without pyarrow the cleaned chunks are concatenated instead.
+
+    Returns (frame, report) with report = {'rows', 'skipped_rows', 'chunks',
+    'quarantine_file'}. A fresh sidecar is read as is (on_chunk is not called) and the
+    report comes from its metadata.
+    """
+    path = sidecar_path(file_path)
+    if _sidecar_is_fresh(path, file_path):
+        try:
+            meta = _sidecar_metadata(path)
+            if 'skipped_rows' not in meta:
+                raise ValueError("sidecar sin reporte de ingesta")  # Escrito por el modo 'full'
+            df = _read_sidecar(path)
+            return df, {
+                'rows': len(df),
+                'skipped_rows': int(meta.get('skipped_rows', 0)),
+                'chunks': 0,
+                'quarantine_file': meta.get('quarantine_file') or None,
+            }
+        except Exception:
+            pass  # Un sidecar corrupto (o sin reporte) se regenera a partir del CSV
+
+    quarantine = BadLineQuarantine(quarantine_path(file_path))
+    # La huella se toma antes de leer: si el CSV cambia durante la ingesta, el sidecar no queda fresco
+    metadata = {k.encode(): v.encode() for k, v in file_fingerprint(file_path).items()}
+    metadata[b'schema'] = SCHEMA_VERSION.encode()
+    rows, chunks, frames = 0, 0, []
+    writer, schema = None, None
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        for chunk in iter_budget_chunks(file_path, chunksize=chunksize, quarantine=quarantine):
+            if on_chunk is not None:
+                on_chunk(chunk)
+            rows += len(chunk)
+            chunks += 1
+            if pq is None:
+                frames.append(chunk)
+                continue
+            table, schema = _arrow_chunk(chunk, schema, metadata)
+            if writer is None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                writer = pq.ParquetWriter(tmp_path, schema)
+            writer.write_table(table)
+    except BaseException:
+        quarantine.discard()
+        if writer is not None:
+            writer.close()
+            os.remove(tmp_path)
+        raise
+    quarantine_file = quarantine.close()
+    report = {'rows': rows, 'skipped_rows': quarantine.count, 'chunks': chunks, 'quarantine_file': quarantine_file}
+
+    if pq is None:
+        empty = _empty_budget_frame(file_path)
+        return concat_budget_frames(frames) if frames else empty, report
+    if writer is None:
+        # CSV sin filas válidas: el sidecar se escribe a partir del frame vacío
+        empty = _empty_budget_frame(file_path)
+        writer = pq.ParquetWriter(tmp_path, _arrow_chunk(empty, metadata=metadata)[1])
+    writer.add_key_value_metadata({'skipped_rows': str(quarantine.count), 'quarantine_file': quarantine_file or ''})
+    writer.close()
+    os.replace(tmp_path, path)
+    return _sort_categories(_read_sidecar(path)), report
+
+
+# --- Multi-file Ingest ---
+def list_budget_files(dir_path):
+    """
+    Budget CSVs of a folder (one per year, subsidiary or revision), sorted by name.
+    """
+    return sorted(glob.glob(os.path.join(dir_path, '*.csv')))
+
+
+def source_key(file_path):
+    """
+    Source label of a budget file: its name without extension ('presupuesto2025').
+    """
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+def load_budget_dir(dir_path, max_workers=None):
+    """
+    Loads every CSV of a folder into one frame with a SOURCE_COLUMN key.
+    Each file keeps its own sidecar, so only the files that changed are parsed;
+    when several changed they are parsed in parallel in a process pool.
+    """
+    files = list_budget_files(dir_path)
+    if not files:
+        raise FileNotFoundError(dir_path)
+
+    frames = {}
+    stale = []
+    for path in files:
+        if _sidecar_is_fresh(sidecar_path(path), path):
+            try:
+                frames[path] = _read_sidecar(sidecar_path(path))
+                continue
+            except Exception:
+                pass
+        stale.append(path)
+
+    if len(stale) == 1:
+        frames[stale[0]] = load_budget(stale[0])
+    elif stale:
+        workers = min(len(stale), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, df in zip(stale, pool.map(load_budget, stale)):
+                frames[path] = df
+
+    combined = concat_budget_frames([frames[path].assign(**{SOURCE_COLUMN: source_key(path)}) for path in files])
+    combined[SOURCE_COLUMN] = combined[SOURCE_COLUMN].astype('category')
+    return combined
+
+
+def source_options(df):
+    """
+    Sources present in a combined frame, or [] for a single-file frame.
+    """
+    if SOURCE_COLUMN not in df.columns:
+        return []
+    return sorted(df[SOURCE_COLUMN].unique().astype(str))
+
+
+def describe_budget(df):
+    """
+    What the sidebar filters need from a cleaned frame: areas, money columns and
+    sources. None for an empty frame (load failed).
+    """
+    if df.empty:
+        return None
+    return {
+        'areas': sorted(df['Area'].unique().astype(str)),
+        'measures': money_columns(df),
+        'sources': source_options(df),
+    }
@@ -0,0 +1,96 @@
+# budget_dataset.py
+
+import numpy as np
+
+from budget_analysis import CENIFLORES_AREA
+from budget_data import SOURCE_COLUMN, describe_budget
+
+
+def _read_only(positions):
+    # int32 basta para cualquier presupuesto y ocupa la mitad que int64
+    positions = positions.astype(np.int32)
+    positions.setflags(write=False)
+    return positions
+
+
+def _row_positions(mask):
+    return _read_only(np.flatnonzero(mask))
+
+
+def _group_positions(column):
+    return {str(key): _read_only(positions) for key, positions in column.groupby(column, observed=True, sort=True).indices.items()}
+
+
+class BudgetDataset:
+    """
+    One version of the budget, loaded once per process and shared read-only by every
+    session (see load_data in dashboard.py). Nothing is copied up front: the
+    "General" split (rows without / with the Ceniflores income) and the rows of
+    each area and source are kept as read-only position arrays, and a view is only
+    materialized when asked for. With pandas copy-on-write, a caller that modifies
+    a view gets its own copy, so the shared frame never changes.
+    """
+    def __init__(self, df, version=None, ingest_report=None):
+        self.frame = df
+        self.version = version
+        self.info = describe_budget(df)
+        if self.info is not None:
+            self.info['ingest'] = ingest_report
+        if self.info is None:
+            empty = _row_positions(np.zeros(0, dtype=bool))
+            self.main_rows, self.ceniflores_income_rows = empty, empty
+            self.area_rows, self.source_rows = {}, {}
+        else:
+            ceniflores_income = ((df['Area'] == CENIFLORES_AREA) & (df['Tipo'] == 'Ingresos')).to_numpy()
+            self.main_rows = _row_positions(~ceniflores_income)
+            self.ceniflores_income_rows = _row_positions(ceniflores_income)
+            self.area_rows = _group_positions(df['Area'])
+            self.source_rows = _group_positions(df[SOURCE_COLUMN]) if SOURCE_COLUMN in df.columns else {}
+        # Constante: el frame no cambia, se mide una sola vez
+        self._frame_bytes = int(df.memory_usage(deep=True).sum())
+
+    # --- Views ---
+    def rows(self, positions):
+        return self.frame.iloc[positions]
+
+    def main(self):
+        """
+        Rows of the "General" view: everything except the Ceniflores income.
+        """
+        return self.rows(self.main_rows)
+
+    def ceniflores_income(self):
+        return self.rows(self.ceniflores_income_rows)
+
+    def area(self, area):
+        """
+        All the rows of one area (for Ceniflores, including its own income).
+        """
+        return self.rows(self.area_rows.get(area, self.main_rows[:0]))
+
+    def for_sources(self, sources):
+        """
+        The rows of the selected sources, like budget_analysis.filter_sources but from
+        the precomputed positions. With no selection (or a single file) it is the
+        shared frame itself.
+        """
+        if not sources or not self.source_rows or set(sources) >= set(self.source_rows):
+            return self.frame
+        picked = [self.source_rows[source] for source in sources if source in self.source_rows]
+        return self.rows(np.sort(np.concatenate(picked)) if picked else self.main_rows[:0])
+
+    # --- Footprint ---
+    def memory_usage(self):
+        """
+        Memory held by the shared dataset: the frame (deep, strings included) and the
+        row-position indices, in MB.
+        """
+        index_bytes = sum(
+            positions.nbytes
+            for positions in [self.main_rows, self.ceniflores_income_rows, *self.area_rows.values(), *self.source_rows.values()]
+        )
+        return {
+            'rows': len(self.frame),
+            'frame_mb': round(self._frame_bytes / 1024 / 1024, 2),
+            'index_mb': round(index_bytes / 1024 / 1024, 2),
+        }
@@ -0,0 +1,321 @@
+# budget_store.py
+
+import contextlib
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import budget_data
+import budget_variance
+from budget_analysis import CENIFLORES_AREA, CUBE_KEYS, DRILLDOWN_LEVELS, PARETO_THRESHOLDS, pareto_flag_column
+from budget_data import BUDGET_COLUMN, SOURCE_COLUMN, TEXT_COLUMNS
+
+# --- Storage Backends ---
+# 'pandas' (por defecto): todo el presupuesto en un DataFrame en memoria.
+# 'sqlite': el CSV se ingiere una vez en un archivo SQLite y los KPIs, agregados y
+# Pareto se calculan con consultas; en memoria solo quedan los resultados.
+BACKEND_ENV_VAR = 'PRESUPUESTO_BACKEND'
+BACKENDS = ('pandas', 'sqlite')
+
+TABLE = 'budget'
+INGEST_CHUNK_ROWS = 100_000
+
+
+def selected_backend():
+    backend = os.environ.get(BACKEND_ENV_VAR, 'pandas').lower()
+    return backend if backend in BACKENDS else 'pandas'
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _column_type(col):
+    if col in budget_data.MONEY_COLUMNS:
+        return 'INTEGER'
+    if col in budget_data.PERCENT_COLUMNS:
+        return 'REAL'
+    return 'TEXT'
+
+
+def database_path(file_path):
+    """
+    Location of the SQLite file for a CSV (or a folder of CSVs), next to the sidecars.
+    """
+    base = os.path.abspath(file_path.rstrip(os.sep))
+    return os.path.join(os.path.dirname(base), budget_data.SIDECAR_DIR, os.path.basename(base) + '.sqlite')
+
+
+class SQLiteBudgetStore:
+    """
+    Budget ledger stored in a local SQLite file with indexes on Area, Tipo and Rubro.
+    The database is rebuilt only when the source version changes; every query opens
+    its own read-only connection, so one store can be shared by all sessions.
+    """
+    def __init__(self, file_path, db_path=None):
+        self.file_path = file_path
+        self.db_path = db_path or database_path(file_path)
+
+    # --- Ingest ---
+    @classmethod
+    def open(cls, file_path, db_path=None):
+        """
+        Returns a store for 'file_path', ingesting it first if the database is missing
+        or was built from another version of the source.
+        """
+        store = cls(file_path, db_path)
+        version = budget_data.dataset_version(file_path)
+        if version is None:
+            raise FileNotFoundError(file_path)
+        if store._stored_version() != version:
+            store._ingest(version)
+        return store
+
+    def _stored_version(self):
+        if not os.path.exists(self.db_path):
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def _source_files(self):
+        if os.path.isdir(self.file_path):
+            return [(path, budget_data.source_key(path)) for path in budget_data.list_budget_files(self.file_path)]
+        return [(self.file_path, None)]
+
+    def _ingest(self, version):
+        """
+        Streams the CSV(s) chunk by chunk into a fresh database, then swaps it in.
+        Peak memory is one chunk, whatever the size of the ledger.
+        """
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        tmp_path = f"{self.db_path}.{os.getpid()}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        source_files = self._source_files()
+        # Una sola tabla para todos los archivos: las columnas opcionales que falten en
+        # un archivo quedan en NULL (to_sql crearía la tabla solo con las del primero)
+        columns = budget_data.budget_columns([path for path, _ in source_files])
+        if os.path.isdir(self.file_path):
+            columns.append(SOURCE_COLUMN)
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute(f"CREATE TABLE {TABLE} ({', '.join(f'{_quote(col)} {_column_type(col)}' for col in columns)})")
+            has_rows = False
+            skipped_rows, quarantine_files = 0, []
+            for path, source in source_files:
+                # Las líneas mal formadas de cada archivo quedan en su cuarentena, con su número de línea
+                quarantine = budget_data.BadLineQuarantine(budget_data.quarantine_path(path))
+                try:
+                    for chunk in budget_data.iter_budget_chunks(path, chunksize=INGEST_CHUNK_ROWS, quarantine=quarantine):
+                        chunk = chunk.astype({col: str for col in TEXT_COLUMNS})
+                        if source is not None:
+                            chunk[SOURCE_COLUMN] = source
+                        chunk.reindex(columns=columns).to_sql(TABLE, conn, if_exists='append', index=False)
+                        has_rows = has_rows or not chunk.empty
+                except BaseException:
+                    quarantine.discard()
+                    raise
+                if quarantine.close():
+                    quarantine_files.append(quarantine.path)
+                skipped_rows += quarantine.count
+            if has_rows:
+                for col in ['Area', 'Tipo', 'Rubro']:
+                    conn.execute(f"CREATE INDEX idx_{TABLE}_{col.lower()} ON {TABLE} ({_quote(col)})")
+                conn.execute(f"CREATE INDEX idx_{TABLE}_cube ON {TABLE} (Area, Tipo, Rubro)")
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("INSERT INTO meta VALUES ('version', ?)", (version,))
+            conn.execute("INSERT INTO meta VALUES ('skipped_rows', ?)", (str(skipped_rows),))
+            conn.execute("INSERT INTO meta VALUES ('quarantine_file', ?)", (', '.join(quarantine_files),))
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, self.db_path)
+
+    # --- Queries ---
+    def _connect(self):
+        return contextlib.closing(sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True))
+
+    def _query(self, sql, params=()):
+        with self._connect() as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def columns(self):
+        with self._connect() as conn:
+            return [row[1] for row in conn.execute(f"PRAGMA table_info({TABLE})")]
+
+    def row_count(self):
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0]
+
+    def _source_filter(self, sources):
+        """
+        WHERE clauses and parameters that keep only the selected sources.
+        """
+        if not sources or SOURCE_COLUMN not in self.columns():
+            return [], []
+        return [f"{_quote(SOURCE_COLUMN)} IN ({', '.join('?' for _ in sources)})"], list(sources)
+
+    def money_columns(self):
+        available = set(self.columns())
+        return [col for col in budget_data.MONEY_COLUMNS if col in available]
+
+    def areas(self):
+        return self._query(f"SELECT DISTINCT Area FROM {TABLE} ORDER BY Area")['Area'].tolist()
+
+    def sources(self):
+        if SOURCE_COLUMN not in self.columns():
+            return []
+        return self._query(f"SELECT DISTINCT {_quote(SOURCE_COLUMN)} AS s FROM {TABLE} ORDER BY s")['s'].tolist()
+
+    def ingest_report(self):
+        """
+        Same report as budget_data.load_budget_streaming: rows stored and lines skipped.
+        """
+        with self._connect() as conn:
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        return {
+            'rows': self.row_count(),
+            'skipped_rows': int(meta.get('skipped_rows', 0)),
+            'chunks': None,
+            'quarantine_file': meta.get('quarantine_file') or None,
+        }
+
+    def describe(self):
+        """
+        Same dict as budget_data.describe_budget plus the ingest report, or None if
+        the table is empty.
+        """
+        if self.row_count() == 0:
+            return None
+        return {'areas': self.areas(), 'measures': self.money_columns(), 'sources': self.sources(),
+                'ingest': self.ingest_report()}
+
+    def aggregate_cube(self, value_column=BUDGET_COLUMN):
+        """
+        Same frame as budget_analysis.build_aggregate_cube, computed by a GROUP BY.
+        """
+        keys = CUBE_KEYS + ([SOURCE_COLUMN] if SOURCE_COLUMN in self.columns() else [])
+        key_sql = ', '.join(_quote(key) for key in keys)
+        value = _quote(value_column)
+        return self._query(
+            f"SELECT {key_sql}, COALESCE(SUM({value}), 0) AS total, "
+            f"SUM(CASE WHEN {value} > 0 THEN {value} ELSE 0 END) AS positive "
+            f"FROM {TABLE} GROUP BY {key_sql} ORDER BY {key_sql}"
+        )
+
+    def pareto_table(self, value_column=BUDGET_COLUMN, thresholds=PARETO_THRESHOLDS, sources=()):
+        """
+        Same frame as budget_analysis.build_pareto_table, computed with window functions.
+        Only the rows inside the largest threshold leave the database.
+        """
+        value = _quote(value_column)
+        source_where, params = self._source_filter(sources)
+        where = ["Rubro != 'Personal'", "Tipo != 'Ingresos'", f"{value} > 0"] + source_where
+
+        ranked = self._query(
+            f"""
+            SELECT Area, "Nombre Ceco", amount, cumulative, area_total FROM (
+                SELECT Area, "Nombre Ceco", {value} AS amount,
+                       SUM({value}) OVER (PARTITION BY Area ORDER BY {value} DESC, rowid
+                                          ROWS UNBOUNDED PRECEDING) AS cumulative,
+                       SUM({value}) OVER (PARTITION BY Area) AS area_total
+                FROM {TABLE}
+                WHERE {' AND '.join(where)}
+            )
+            WHERE cumulative - amount < area_total * ?
+            ORDER BY Area, amount DESC, cumulative
+            """,
+            params + [max(thresholds)],
+        )
+
+        table = ranked[['Area', 'Nombre Ceco']].assign(**{value_column: ranked['amount']})
+        table['Cumulative Share'] = ranked['cumulative'] / ranked['area_total']
+        cumulative_before = ranked['cumulative'] - ranked['amount']
+        for threshold in thresholds:
+            table[pareto_flag_column(threshold)] = cumulative_before < ranked['area_total'] * threshold
+        return table.set_index('Area')
+
+    def drilldown_children(self, tipo, path=(), value_column=BUDGET_COLUMN, sources=(), exclude_ceniflores_income=False):
+        """
+        Same frame as budget_analysis.DrilldownIndex.children: one GROUP BY over the
+        rows of the node only, served by the Area/Tipo/Rubro indexes.
+        """
+        level = DRILLDOWN_LEVELS[len(path)]
+        source_where, source_params = self._source_filter(sources)
+        where = ["Tipo = ?"] + [f"{_quote(col)} = ?" for col in DRILLDOWN_LEVELS[:len(path)]] + source_where
+        params = [tipo, *path] + source_params
+        if not path and exclude_ceniflores_income and tipo == 'Ingresos':
+            where.append("Area != ?")
+            params.append(CENIFLORES_AREA)
+
+        children = self._query(
+            f"SELECT {_quote(level)} AS label, COALESCE(SUM({_quote(value_column)}), 0) AS amount FROM {TABLE} "
+            f"WHERE {' AND '.join(where)} GROUP BY label ORDER BY amount DESC, label",
+            params,
+        )
+        return children.rename(columns={'label': level, 'amount': value_column})
+
+    def variance_report(self, n=budget_variance.DEFAULT_TOP_N, sources=()):
+        """
+        Same dict as budget_variance.build_variance_report. The sums are GROUP BYs and
+        the top movers are ranked with ROW_NUMBER(), so no CECO row leaves the database.
+        """
+        where, params = self._source_filter(sources)
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+        # COALESCE: en una carpeta, un archivo sin la columna la deja en NULL y la suma no debe ser NULL
+        sums = ', '.join(f"COALESCE(SUM({_quote(col)}), 0) AS {_quote(col)}" for col in budget_variance.VARIANCE_INPUTS)
+
+        def aggregate(keys):
+            key_sql = ', '.join(_quote(key) for key in keys)
+            frame = self._query(f"SELECT {key_sql}, {sums} FROM {TABLE} {where_sql} GROUP BY {key_sql} ORDER BY {key_sql}", params)
+            return budget_variance.add_variance_columns(frame)
+
+        return {
+            'by_area': aggregate(['Tipo', 'Area']),
+            'by_rubro': aggregate(['Tipo', 'Area', 'Rubro']),
+            'movers': self._top_movers(n, True, where, params),
+            'movers_all': self._top_movers(n, False, where, params),
+        }
+
+    def _top_movers(self, n, per_area, where, params, tipo='Egresos'):
+        budget, executed = _quote(BUDGET_COLUMN), _quote(budget_variance.EXECUTED_COLUMN)
+        partition = "PARTITION BY Area " if per_area else ""
+        ranked = self._query(
+            f"""
+            SELECT Area, "Nombre Ceco", Rubro, budget, executed, delta, over_rank, under_rank FROM (
+                SELECT Area, "Nombre Ceco", Rubro, {budget} AS budget, {executed} AS executed,
+                       {executed} - {budget} AS delta,
+                       ROW_NUMBER() OVER ({partition}ORDER BY {executed} - {budget} DESC, rowid) AS over_rank,
+                       ROW_NUMBER() OVER ({partition}ORDER BY {executed} - {budget} ASC, rowid) AS under_rank
+                FROM {TABLE}
+                WHERE {' AND '.join(['Tipo = ?', f"{executed} IS NOT NULL", f"{budget} IS NOT NULL"] + where)}
+            )
+            WHERE (over_rank <= ? AND delta > 0) OR (under_rank <= ? AND delta < 0)
+            """,
+            [tipo] + params + [n, n],
+        )
+        over = ranked['delta'] > 0
+        ranked['Movimiento'] = np.where(over, budget_variance.OVER_EXECUTION, budget_variance.UNDER_EXECUTION)
+        ranked['rank'] = ranked['over_rank'].where(over, ranked['under_rank'])
+        ranked['order'] = (~over).astype(int)
+        ranked = ranked.sort_values((['Area'] if per_area else []) + ['order', 'rank'], kind='stable')
+
+        delta = ranked['delta'].to_numpy(dtype='float64')
+        movers = pd.DataFrame({
+            'Area': ranked['Area'].to_numpy(),
+            'Movimiento': ranked['Movimiento'].to_numpy(),
+            'Nombre Ceco': ranked['Nombre Ceco'].to_numpy(),
+            'Rubro': ranked['Rubro'].to_numpy(),
+            BUDGET_COLUMN: ranked['budget'].to_numpy(),
+            budget_variance.EXECUTED_COLUMN: ranked['executed'].to_numpy(),
+            budget_variance.DELTA: delta,
+            budget_variance.DELTA_PCT: budget_variance.safe_ratio(delta, ranked['budget'].to_numpy(dtype='float64')),
+        })
+        return movers
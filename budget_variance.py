@@ -0,0 +1,130 @@
+# budget_variance.py
+
+import numpy as np
+
+from budget_data import BUDGET_COLUMN
+
+# --- Columns ---
+EXECUTED_COLUMN = 'Ejecutado a ago + extracontable'
+NEXT_BUDGET_COLUMN = 'Presupuesto 2026'
+VARIANCE_INPUTS = [BUDGET_COLUMN, EXECUTED_COLUMN, NEXT_BUDGET_COLUMN]
+
+EXECUTION_PCT = 'Ejecución %'
+DELTA = 'Desviación $'
+DELTA_PCT = 'Desviación %'
+GROWTH = 'Crecimiento 2026 $'
+GROWTH_PCT = 'Crecimiento 2026 %'
+
+OVER_EXECUTION = 'Sobre-ejecución'
+UNDER_EXECUTION = 'Sub-ejecución'
+DEFAULT_TOP_N = 10
+
+
+def has_variance_inputs(columns):
+    return all(col in columns for col in VARIANCE_INPUTS)
+
+
+def safe_ratio(numerator, denominator):
+    # Sin presupuesto no hay porcentaje: NaN en lugar de infinito
+    return np.divide(numerator, denominator, out=np.full(len(numerator), np.nan), where=denominator != 0)
+
+
+# --- Variance Engine ---
+def add_variance_columns(frame):
+    """
+    Adds execution %, deltas and 2025→2026 growth to a frame that has the three
+    VARIANCE_INPUTS, for all rows at once with numpy. Works on CECO rows and on
+    aggregated rows alike (the percentages of a group are ratios of its sums).
+    """
+    budget = frame[BUDGET_COLUMN].to_numpy(dtype='float64')
+    executed = frame[EXECUTED_COLUMN].to_numpy(dtype='float64')
+    next_budget = frame[NEXT_BUDGET_COLUMN].to_numpy(dtype='float64')
+    delta = executed - budget
+    growth = next_budget - budget
+    return frame.assign(**{
+        EXECUTION_PCT: safe_ratio(executed, budget),
+        DELTA: delta,
+        DELTA_PCT: safe_ratio(delta, budget),
+        GROWTH: growth,
+        GROWTH_PCT: safe_ratio(growth, budget),
+    })
+
+
+def compute_variance(df):
+    """
+    Per-CECO variance frame: the text keys, the three inputs and the derived columns.
+    """
+    return add_variance_columns(df[['Area', 'Tipo', 'Rubro', 'Nombre Ceco'] + VARIANCE_INPUTS])
+
+
+def aggregate_variance(variance, keys):
+    """
+    Sums the inputs by 'keys' (e.g. ['Tipo', 'Area']) and recomputes the ratios.
+    """
+    sums = variance.groupby(keys, observed=True, sort=True)[VARIANCE_INPUTS].sum().reset_index()
+    return add_variance_columns(sums)
+
+
+# --- Top Movers ---
+def _top_positions(positions, scores, n):
+    """
+    Positions of the n largest positive scores, largest first; equal scores keep
+    their row order, as the SQL backend's ORDER BY ..., rowid. np.argpartition finds
+    the n-th largest score in linear time; only the rows at or above it are sorted.
+    """
+    k = min(n, len(positions))
+    if k == 0:
+        return positions[:0]
+    # argpartition deja los empates en orden arbitrario: se toman todos los empatados
+    # con el n-ésimo y se desempata por posición
+    cutoff = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    candidates = np.flatnonzero(scores >= cutoff)
+    picked = candidates[np.lexsort((positions[candidates], -scores[candidates]))][:k]
+    picked = picked[scores[picked] > 0]
+    return positions[picked]
+
+
+def top_movers(variance, n=DEFAULT_TOP_N, tipo='Egresos', per_area=True):
+    """
+    The n CECOs of a Tipo that most over-execute (executed above budget) and the n
+    that most under-execute, per area (or for the whole organization with
+    per_area=False). Columns: Area, 'Movimiento', 'Nombre Ceco', 'Rubro', the inputs
+    and the deltas.
+    """
+    rows = variance[variance['Tipo'] == tipo]
+    delta = rows[DELTA].to_numpy()
+    if per_area:
+        groups = rows.groupby('Area', observed=True, sort=True).indices.values()
+    else:
+        groups = [np.arange(len(rows))]
+
+    selected, labels = [], []
+    for positions in groups:
+        for label, sign in ((OVER_EXECUTION, 1), (UNDER_EXECUTION, -1)):
+            top = _top_positions(positions, sign * delta[positions], n)
+            selected.append(top)
+            labels.extend([label] * len(top))
+
+    columns = ['Area', 'Nombre Ceco', 'Rubro', BUDGET_COLUMN, EXECUTED_COLUMN, DELTA, DELTA_PCT]
+    movers = rows.iloc[np.concatenate(selected) if selected else []][columns].reset_index(drop=True)
+    movers.insert(1, 'Movimiento', labels)
+    return movers.astype({'Area': str, 'Nombre Ceco': str, 'Rubro': str})
+
+
+def build_variance_report(df, n=DEFAULT_TOP_N):
+    """
+    Everything the variance tab shows, computed from one vectorized pass over the
+    CECOs: sums per (Tipo, Area) and (Tipo, Area, Rubro), and the top movers per area
+    and organization-wide. Only these small frames are kept (and cached).
+    """
+    variance = compute_variance(df)
+    return {
+        'by_area': aggregate_variance(variance, ['Tipo', 'Area']).astype({'Tipo': str, 'Area': str}),
+        'by_rubro': aggregate_variance(variance, ['Tipo', 'Area', 'Rubro']).astype({'Tipo': str, 'Area': str, 'Rubro': str}),
+        'movers': top_movers(variance, n),
+        'movers_all': top_movers(variance, n, per_area=False),
+    }
+
+
+def has_execution_data(report):
+    return bool(report['by_area'][EXECUTED_COLUMN].any())
@@ -0,0 +1,106 @@
+# cache_warmup.py
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Configuration ---
+# Se activa con la variable de entorno DASHBOARD_WARMUP=1
+WARMUP_ENV_VAR = 'DASHBOARD_WARMUP'
+WARMUP_WORKERS_ENV_VAR = 'DASHBOARD_WARMUP_WORKERS'
+DEFAULT_WORKERS = 4
+THREAD_PREFIX = 'cache-warmup'
+
+
+def env_enabled():
+    return os.environ.get(WARMUP_ENV_VAR, '').lower() in ('1', 'true', 'yes')
+
+
+def env_workers():
+    try:
+        return max(1, int(os.environ.get(WARMUP_WORKERS_ENV_VAR, DEFAULT_WORKERS)))
+    except ValueError:
+        return DEFAULT_WORKERS
+
+
+class _SkipWarmupThreads(logging.Filter):
+    def filter(self, record):
+        return not record.threadName.startswith(THREAD_PREFIX)
+
+
+_skip_warmup_threads = _SkipWarmupThreads()
+
+
+def quiet_logger(name):
+    """
+    Drops the records the warm-up threads log on 'name' (e.g. Streamlit's warning
+    about threads without a script context, expected here). Idempotent.
+    """
+    logging.getLogger(name).addFilter(_skip_warmup_threads)
+
+
+class CacheWarmup:
+    """
+    Runs named warm-up tasks (one per view) in a background thread pool. start()
+    returns at once, so serving never waits for it; status() reports progress and,
+    once every task finished, the total duration. A failing task is recorded and
+    does not stop the others.
+    """
+    def __init__(self, tasks, max_workers=DEFAULT_WORKERS):
+        self.tasks = list(tasks)
+        self.max_workers = max_workers
+        self.done = 0
+        self.failed = {}
+        self.task_ms = {}
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.started_at is not None:
+            return self
+        self.started_at = time.perf_counter()
+        if not self.tasks:
+            self.finished_at = self.started_at
+            return self
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=THREAD_PREFIX)
+        for name, task in self.tasks:
+            pool.submit(self._run, name, task)
+        pool.shutdown(wait=False)  # Los hilos terminan solos; nadie espera por ellos
+        return self
+
+    def _run(self, name, task):
+        start = time.perf_counter()
+        error = None
+        try:
+            task()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        with self._lock:
+            self.task_ms[name] = round((time.perf_counter() - start) * 1000, 2)
+            if error is not None:
+                self.failed[name] = error
+            self.done += 1
+            if self.done == len(self.tasks):
+                self.finished_at = time.perf_counter()
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    def status(self):
+        """
+        Progress snapshot: tasks done/total, elapsed (or total) seconds, per-task ms and failures.
+        """
+        with self._lock:
+            end = self.finished_at if self.finished_at is not None else time.perf_counter()
+            return {
+                'state': 'done' if self.finished_at is not None else ('running' if self.started_at is not None else 'pending'),
+                'done': self.done,
+                'total': len(self.tasks),
+                'seconds': round(end - self.started_at, 3) if self.started_at is not None else 0.0,
+                'task_ms': dict(self.task_ms),
+                'failed': dict(self.failed),
+            }
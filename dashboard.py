@@ -2,13 +2,36 @@
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import textwrap
-import base64
+import os
+
+import budget_data
+import budget_dataset
+import budget_store
+import budget_variance
+import budget_analysis
+import budget_charts
+import cache_warmup
+import dataset_watcher
+import profiling
+import static_assets
+from budget_charts import format_currency, format_currency_millions, format_percent
 
 # --- Page Configuration ---
 st.set_page_config(layout="wide")
 
+# --- Background Image (static assets) ---
+@st.cache_resource
+def get_background_css(image_file):
+    """
+    Builds the background CSS once per process. The image is served by URL from
+    ./static as downscaled WebP/JPEG variants; if they can't be generated it falls
+    back to a (memoized) base64 data URI.
+    """
+    urls = static_assets.build_image_variants(image_file)
+    if urls:
+        return static_assets.background_css(urls)
+    return f'.stApp {{ background-image: url("{static_assets.encode_data_uri(image_file)}"); }}'
+
 # --- Function to Inject All Custom CSS ---
 def inject_custom_css(image_file):
     """
@@ -16,9 +39,7 @@ def inject_custom_css(image_file):
     Includes responsive CSS for fonts and layout.
     """
     try:
-        with open(image_file, "rb") as f:
-            img_bytes = f.read()
-        encoded_img = base64.b64encode(img_bytes).decode()
+        background_rule = get_background_css(image_file)
         
         # --- MODIFICACIÓN RESPONSIVA ---
         # Se ha reescrito la etiqueta <style> para incluir 'clamp()' para fuentes
@@ -27,8 +48,8 @@ def inject_custom_css(image_file):
             f"""
             <style>
             /* --- Background Image --- */
+            {background_rule}
             .stApp {{
-                background-image: url("data:image/png;base64,{encoded_img}");
                 background-size: cover !important;
                 background-repeat: no-repeat !important;
                 background-attachment: fixed;
@@ -66,6 +87,9 @@ def inject_custom_css(image_file):
                 color: white !important;
             }}
 
+            /* --- Tablas (clase compartida, ver budget_charts.TABLE_CSS) --- */
+            {budget_charts.TABLE_CSS}
+
             /* --- Tabs --- */
             button[data-baseweb="tab"] {{
                 color: white;
@@ -126,52 +150,53 @@ def inject_custom_css(image_file):
         st.warning(f"Advertencia: No se encontró la imagen de fondo '{image_file}'.")
 
 # --- Data Loading and Caching ---
-@st.cache_data
-def load_data(file_path):
+@st.cache_resource
+def get_dataset_watcher(file_path):
+    """
+    One watcher per CSV and process: it reloads the file when it changes, parsing only
+    the appended rows when possible (see dataset_watcher.py).
+    """
+    watcher = dataset_watcher.DatasetWatcher(file_path)
+    watcher.start()
+    return watcher
+
+@st.cache_resource(max_entries=2)
+def load_data(file_path, data_version):
     """
-    Loads the main budget data from the csv file.
+    Loads the main budget data from the csv file as a BudgetDataset.
+    Keyed on the file's version (size + mtime), so a new CSV is picked up without
+    restarting and only the caches of the old version are dropped. It is a shared
+    resource: one read-only frame per process, not a deserialized copy per session
+    and rerun (as st.cache_data would return).
     """
+    profiling.count_cache_miss('load_data')
     try:
-        # --- MODIFICACIÓN: Usamos el nombre de archivo que subiste 'presupuesto20251.csv' ---
+        # Una carpeta de presupuestos (uno por año/entidad/revisión) se carga en paralelo
+        if os.path.isdir(file_path):
+            return budget_dataset.BudgetDataset(budget_data.load_budget_dir(file_path), data_version)
         # Asegúrate de que el delimitador es correcto, tu archivo usa ';'
-        df = pd.read_csv(file_path, delimiter=';', engine='python', on_bad_lines='skip')
-        df.columns = df.columns.str.strip()
-        
-        # --- MODIFICACIÓN: Ajuste de columnas requeridas según tu CSV ---
-        # Tu CSV tiene 'Area' (con tilde)
-        required_cols = ['Tipo', 'Rubro', 'Area', 'Presupuesto 2025', 'Nombre Ceco']
-        
-        missing_cols = [col for col in required_cols if col not in df.columns]
-        if missing_cols:
-            st.error(f"Error Crítico: Faltan las siguientes columnas requeridas: {', '.join(missing_cols)}")
-            st.info(f"Las columnas encontradas son: {', '.join(df.columns)}")
-            return pd.DataFrame()
+        watcher = get_dataset_watcher(file_path)
+        # La versión es la que el watcher cargó de verdad: si el CSV cambió desde que el
+        # script calculó data_version, el dataset lleva la nueva (ver el flujo principal)
+        version, frame = watcher.refresh()
+        return budget_dataset.BudgetDataset(frame, version, ingest_report=watcher.ingest_report)
 
-        df_selection = df[required_cols].copy()
-        
-        # Limpieza de la columna de presupuesto
-        df_selection['Presupuesto 2025'] = df_selection['Presupuesto 2025'].astype(str).str.replace('[$.]', '', regex=True).str.replace(',', '.', regex=False)
-        df_selection['Presupuesto 2025'] = pd.to_numeric(df_selection['Presupuesto 2025'], errors='coerce').fillna(0)
-        
-        # Limpieza de columnas de texto
-        df_selection['Tipo'] = df_selection['Tipo'].fillna('N/A').str.strip()
-        df_selection['Rubro'] = df_selection['Rubro'].fillna('N/A').str.strip()
-        df_selection['Area'] = df_selection['Area'].fillna('N/A').str.strip()
-        df_selection['Nombre Ceco'] = df_selection['Nombre Ceco'].fillna('N/A').str.strip()
-        
-        return df_selection
-        
+    except budget_data.MissingColumnsError as e:
+        st.error(f"Error Crítico: Faltan las siguientes columnas requeridas: {', '.join(e.missing)}")
+        st.info(f"Las columnas encontradas son: {', '.join(e.found)}")
+        return budget_dataset.BudgetDataset(pd.DataFrame(), data_version)
     except FileNotFoundError:
         st.error(f"Error: No se encontró el archivo '{file_path}'.")
-        return pd.DataFrame()
+        return budget_dataset.BudgetDataset(pd.DataFrame(), data_version)
     except Exception as e:
         st.error(f"Ocurrió un error inesperado al cargar los datos: {e}")
-        return pd.DataFrame()
+        return budget_dataset.BudgetDataset(pd.DataFrame(), data_version)
 
 @st.cache_data
-def load_arguments_data(file_path):
+def load_arguments_data(file_path, data_version=None):
     """
-    Loads and cleans the arguments data from expo.csv.
+    Loads and cleans the arguments data from expo.csv. 'data_version' only keys the
+    cache, so an edited file is read again.
     """
     try:
         df_args = pd.read_csv(file_path, delimiter=';', on_bad_lines='warn')
@@ -193,9 +218,10 @@ def load_arguments_data(file_path):
         return pd.DataFrame()
 
 @st.cache_data
-def load_salaries_data(file_path):
+def load_salaries_data(file_path, data_version=None):
     """
-    Loads, cleans, and prepares the salaries data from salarios.csv.
+    Loads, cleans, and prepares the salaries data from salarios.csv. 'data_version'
+    only keys the cache, so an edited file is read again.
     """
     try:
         df_sal = pd.read_csv(file_path, delimiter=';')
@@ -211,315 +237,802 @@ def load_salaries_data(file_path):
         
         return df_sal
     except FileNotFoundError:
-        st.warning(f"Advertencia: No se encontró el archivo de salarios '{file_path}'. La pestaña 'Salarios' no tendrá datos.")
+        st.warning(f"Advertencia: No se encontró el archivo de salarios '{file_path}'. La pestaña 'Nómina' no tendrá datos.")
         return pd.DataFrame()
     except Exception as e:
         st.error(f"Error al cargar los datos de salarios: {e}")
         return pd.DataFrame()
 
-# --- Analysis Function ---
-def perform_pareto_analysis(data_df):
+@st.cache_resource(max_entries=2)
+def get_payroll_index(file_path, data_version):
     """
-    Performs a Pareto (80/20) analysis to find the top items
-    that constitute 80% of the total budget.
+    Salaries pre-aggregated by Area, built once per version of salarios.csv.
+    None if the file is missing or invalid. Shared, read-only.
     """
-    analysis_df = data_df[
-        (data_df['Rubro'] != 'Personal') &
-        (data_df['Tipo'] != 'Ingresos') &
-        (data_df['Presupuesto 2025'] > 0)
-    ].copy()
+    df_salaries = load_salaries_data(file_path, data_version)
+    if df_salaries.empty:
+        return None
+    return budget_analysis.PayrollIndex(df_salaries)
 
-    if analysis_df.empty:
-        return pd.DataFrame(columns=['Nombre Ceco', 'Presupuesto 2025']) 
+# --- SQL Backend (PRESUPUESTO_BACKEND=sqlite) ---
+@st.cache_resource(max_entries=2)
+def get_sql_store(file_path, data_version):
+    """
+    SQLite copy of the budget, (re)ingested only when the dataset version changes.
+    """
+    return budget_store.SQLiteBudgetStore.open(file_path)
 
-    sorted_df = analysis_df.sort_values(by='Presupuesto 2025', ascending=False)
+@st.cache_data(max_entries=2)
+def load_store_info(file_path, data_version):
+    """
+    Areas, money columns and sources from the SQL backend; the frame is never loaded.
+    """
+    profiling.count_cache_miss('load_data')
+    try:
+        return get_sql_store(file_path, data_version).describe()
+    except budget_data.MissingColumnsError as e:
+        st.error(f"Error Crítico: Faltan las siguientes columnas requeridas: {', '.join(e.missing)}")
+        st.info(f"Las columnas encontradas son: {', '.join(e.found)}")
+        return None
+    except FileNotFoundError:
+        st.error(f"Error: No se encontró el archivo '{file_path}'.")
+        return None
+    except Exception as e:
+        st.error(f"Ocurrió un error inesperado al cargar los datos: {e}")
+        return None
 
-    total_budget = sorted_df['Presupuesto 2025'].sum()
-    target_80_percent = total_budget * 0.80
+@st.cache_data(max_entries=32)
+def load_aggregate_cube(file_path, data_version, value_column=budget_data.BUDGET_COLUMN):
+    """
+    The (Area, Tipo, Rubro) aggregate cube, once per dataset version and measure.
+    The watcher updates it incrementally when rows are only appended to the CSV.
+    """
+    if BACKEND == 'sqlite':
+        return get_sql_store(file_path, data_version).aggregate_cube(value_column)
+    if os.path.isdir(file_path):
+        return budget_analysis.build_aggregate_cube(load_data(file_path, data_version).frame, value_column)
+    try:
+        return get_dataset_watcher(file_path).aggregate_cube(data_version, value_column)
+    except dataset_watcher.VersionChangedError:
+        # El CSV cambió otra vez durante esta ejecución: nada se guarda bajo la versión vieja
+        st.rerun()
 
-    sorted_df['Cumulative Sum'] = sorted_df['Presupuesto 2025'].cumsum()
+@st.cache_data(max_entries=32)
+def load_grand_totals(file_path, data_version, value_column=budget_data.BUDGET_COLUMN, sources=()):
+    """
+    (ingresos, egresos, resultado neto) of the "General" view for the KPI row.
+    """
+    cube = budget_analysis.filter_sources(load_aggregate_cube(file_path, data_version, value_column), sources)
 
-    cutoff_index = sorted_df[sorted_df['Cumulative Sum'] >= target_80_percent].index
-    
-    if len(cutoff_index) > 0:
-        pareto_df = sorted_df.loc[:cutoff_index[0]]
+    # --- NUEVO: Filtro Avanzado Ceniflores ---
+    # La vista "General" y los KPIs usan el cubo SIN los ingresos de Ceniflores
+    cube_main = budget_analysis.cube_for_view(cube, "General")
+    total_ingresos = budget_analysis.total_by_tipo(cube_main, 'Ingresos')
+    total_egresos = budget_analysis.total_by_tipo(cube_main, 'Egresos')
+    return total_ingresos, total_egresos, total_ingresos - total_egresos
+
+@st.cache_resource(max_entries=32)
+def load_pareto_table(_dataset, data_version, value_column=budget_data.BUDGET_COLUMN, sources=()):
+    """
+    Pareto cutoffs (every configured threshold) for every area, once per dataset version,
+    measure and selection of sources. Shared, read-only: it can have as many rows as
+    the ledger has positive egresos, so it is not copied per rerun.
+    """
+    return budget_analysis.build_pareto_table(_dataset.for_sources(sources), value_column=value_column)
+
+@st.cache_data(max_entries=32)
+def load_sql_pareto_table(file_path, data_version, value_column=budget_data.BUDGET_COLUMN, sources=()):
+    """
+    Same table as load_pareto_table, ranked inside SQLite with window functions.
+    """
+    return get_sql_store(file_path, data_version).pareto_table(value_column, sources=sources)
+
+# --- Variance Report ---
+@st.cache_data(max_entries=8)
+def load_variance_report(_dataset, data_version, sources=()):
+    """
+    Execution and growth tables plus top movers, once per dataset version and
+    selection of sources. None when the CSV lacks the execution or 2026 budget columns.
+    """
+    if not budget_variance.has_variance_inputs(_dataset.frame.columns):
+        return None
+    return budget_variance.build_variance_report(_dataset.for_sources(sources))
+
+@st.cache_data(max_entries=8)
+def load_sql_variance_report(file_path, data_version, sources=()):
+    """
+    Same report as load_variance_report, computed inside SQLite.
+    """
+    store = get_sql_store(file_path, data_version)
+    if not budget_variance.has_variance_inputs(store.columns()):
+        return None
+    return store.variance_report(sources=sources)
+
+# --- Drill-down Index ---
+@st.cache_resource(max_entries=8)
+def get_drilldown_index(_dataset, data_version, value_column=budget_data.BUDGET_COLUMN, sources=()):
+    """
+    Area → Rubro → Nombre Ceco index, built once per dataset version, measure and
+    selection of sources. Shared, read-only.
+    """
+    return budget_analysis.DrilldownIndex(_dataset.for_sources(sources), value_column)
+
+@st.cache_data(max_entries=256)
+def load_sql_drilldown_children(file_path, data_version, tipo, path, value_column=budget_data.BUDGET_COLUMN, sources=(), exclude_ceniflores_income=False):
+    """
+    Children of one drill-down node from the SQL backend; only that node is queried.
+    """
+    return get_sql_store(file_path, data_version).drilldown_children(tipo, path, value_column, sources, exclude_ceniflores_income)
+
+def drilldown_children(data_file, data_version, dataset, measure, sources, tipo, path, exclude_ceniflores_income):
+    if BACKEND == 'sqlite':
+        return load_sql_drilldown_children(data_file, data_version, tipo, path, measure, sources, exclude_ceniflores_income)
+    index = get_drilldown_index(dataset, data_version, measure, sources)
+    return index.children(tipo, path, exclude_ceniflores_income)
+
+# --- Figure Cache ---
+@st.cache_resource
+def get_figure_cache():
+    """
+    Process-wide LRU cache of figure specs. Its size can be tuned with the
+    FIGURE_CACHE_MAX_MB environment variable.
+    """
+    max_mb = float(os.environ.get('FIGURE_CACHE_MAX_MB', 32))
+    return budget_charts.FigureCache(max_bytes=int(max_mb * 1024 * 1024))
+
+# --- Tables ---
+TABLE_PAGE_SIZE = 50
+
+@st.cache_resource(max_entries=1024)
+def get_table_page_html(table, selected_area, data_version, variant, page, _frame, _formatters=None):
+    """
+    HTML of one page of a table, memoized per (table, area, data version, variant, page).
+    'variant' must cover everything else the rows depend on (measure, sources, ...).
+    """
+    rows = _frame.iloc[page * TABLE_PAGE_SIZE:(page + 1) * TABLE_PAGE_SIZE]
+    return budget_charts.render_table_html(rows, _formatters)
+
+def show_table(frame, table, selected_area, data_version, variant='', formatters=None):
+    """
+    Renders a table with the shared theme, TABLE_PAGE_SIZE rows per page.
+    """
+    pages = max(1, -(-len(frame) // TABLE_PAGE_SIZE))
+    page = 0
+    if pages > 1:
+        page = st.number_input(
+            f"Página (de {pages})", min_value=1, max_value=pages, value=1,
+            key=f"page|{table}|{selected_area}|{variant}"
+        ) - 1
+    st.markdown(get_table_page_html(table, selected_area, data_version, variant, page, frame, formatters), unsafe_allow_html=True)
+    if pages > 1:
+        first = page * TABLE_PAGE_SIZE
+        st.caption(f"Filas {first + 1}–{min(first + TABLE_PAGE_SIZE, len(frame))} de {len(frame)}")
+
+# --- Variance Tab ---
+def _variance_table(frame, label_columns):
+    """
+    Display columns of a variance frame and their formatters: amounts in millions,
+    ratios as percentages.
+    """
+    money = {
+        budget_data.BUDGET_COLUMN: 'Ppto 2025 (M)',
+        budget_variance.EXECUTED_COLUMN: 'Ejecutado (M)',
+        budget_variance.DELTA: 'Desviación (M)',
+        budget_variance.NEXT_BUDGET_COLUMN: 'Ppto 2026 (M)',
+    }
+    percent = {
+        budget_variance.EXECUTION_PCT: 'Ejecución %',
+        budget_variance.DELTA_PCT: 'Desviación %',
+        budget_variance.GROWTH_PCT: 'Crecimiento 2026 %',
+    }
+    labels = {**money, **percent}
+    columns = label_columns + [column for column in labels if column in frame.columns]
+    table = frame[columns].rename(columns={**labels, 'Area': 'Área', 'Nombre Ceco': 'CECO'})
+    formatters = {label: format_currency_millions if column in money else format_percent
+                  for column, label in labels.items() if column in frame.columns}
+    return table, formatters
+
+def render_variance(report, selected_area, data_version, variant):
+    """
+    Execution vs budget for the selected view: KPIs, the Area/Rubro table and the
+    CECOs that most over- and under-execute.
+    """
+    if report is None or not budget_variance.has_execution_data(report):
+        st.info("El archivo no trae datos de ejecución ni de Presupuesto 2026 para comparar.")
+        return
+
+    if selected_area == "General":
+        summary = report['by_area']
+        movers = report['movers_all']
+        label_columns = ['Tipo', 'Area']
     else:
-        pareto_df = sorted_df
-    
-    return pareto_df[['Nombre Ceco', 'Presupuesto 2025']] 
+        summary = report['by_rubro'][report['by_rubro']['Area'] == selected_area]
+        movers = report['movers'][report['movers']['Area'] == selected_area]
+        label_columns = ['Tipo', 'Rubro']
+
+    egresos = budget_variance.add_variance_columns(
+        summary[summary['Tipo'] == 'Egresos'][budget_variance.VARIANCE_INPUTS].sum().to_frame().T)
+    kpi1, kpi2, kpi3 = st.columns(3)
+    kpi1.metric("Egresos presupuestados 2025", format_currency_millions(egresos[budget_data.BUDGET_COLUMN].iloc[0]))
+    kpi2.metric("Egresos ejecutados", format_currency_millions(egresos[budget_variance.EXECUTED_COLUMN].iloc[0]),
+                f"{format_percent(egresos[budget_variance.EXECUTION_PCT].iloc[0])} ejecutado", delta_color="off")
+    kpi3.metric("Egresos presupuestados 2026", format_currency_millions(egresos[budget_variance.NEXT_BUDGET_COLUMN].iloc[0]),
+                format_percent(egresos[budget_variance.GROWTH_PCT].iloc[0]), delta_color="inverse")
+
+    st.markdown(f"##### Ejecución y crecimiento por {'Área' if selected_area == 'General' else 'Rubro'} (en millones de $)")
+    summary_table, formatters = _variance_table(summary, label_columns)
+    show_table(summary_table, 'variance_summary', selected_area, data_version, variant, formatters)
+
+    over_col, under_col = st.columns(2)
+    movers_columns = (['Area'] if selected_area == "General" else []) + ['Nombre Ceco', 'Rubro']
+    for column, label, title, table_name in [
+        (over_col, budget_variance.OVER_EXECUTION, "CECOs con mayor sobre-ejecución (Egresos)", 'movers_over'),
+        (under_col, budget_variance.UNDER_EXECUTION, "CECOs con mayor sub-ejecución (Egresos)", 'movers_under'),
+    ]:
+        with column:
+            st.markdown(f"##### {title}")
+            rows = movers[movers['Movimiento'] == label]
+            if rows.empty:
+                st.info("No hay CECOs en esta categoría.")
+            else:
+                movers_table, formatters = _variance_table(rows, movers_columns)
+                show_table(movers_table, table_name, selected_area, data_version, variant, formatters)
 
-# --- Helper Functions ---
-def format_currency_millions(value):
-    if not isinstance(value, (int, float)) or value == 0:
-        return "$0"
-    value_in_millions = round(value / 1_000_000)
-    formatted_string = f"${value_in_millions:,.0f}".replace(',', '.')
-    return formatted_string
+# --- Area Detail Fragment ---
+# Hijos que se dibujan por nodo del drill-down (la tabla se pagina, el resto queda en el servidor)
+DRILLDOWN_TOP_N = 15
+# Pareto y ejecución se dibujan siempre; "Nómina" y "Argumentos" solo cuando están abiertas
+DETAIL_TABS = ["Análisis Pareto", "Ejecución vs Presupuesto", "Nómina", "Argumentos"]
 
-def wrap_labels(label, length=25):
-    wrapped_text = textwrap.wrap(label, length, break_long_words=False)
-    return '<br>'.join(wrapped_text)
+# --- View Building (shared by render_area_detail and the background warm-up) ---
+MONEY_FORMATTERS = {'Monto (M)': format_currency_millions}
 
-def style_dataframe(df, currency_column=None):
+
+def view_key_for(measure, sources):
+    return f"{measure}|{'+'.join(sources)}"
+
+def build_view_breakdowns(filtered_cube, selected_area, measure, view_key, data_version, figure_cache):
     """
-    Applies custom styling to any DataFrame for display in Streamlit.
+    Rubro/Área breakdowns of the ingresos and egresos rows of a view and their figure
+    specs (None when there is nothing to plot). The warm-up calls it too, so both fill
+    the same figure cache entries.
     """
-    # --- MODIFICACIÓN RESPONSIVA ---
-    # Usamos clamp() para el tamaño de fuente de la tabla
-    font_size_responsive = "clamp(0.8rem, 2vw, 1rem)"
-    
-    styler = df.style.set_properties(**{
-        'background-color': '#b5dbc3', 'color': 'black',
-        'font-size': font_size_responsive, # <-- Aplicado aquí
-        'text-align': 'left', 'white-space': 'normal'
-    }).set_table_styles([
-        {'selector': 'th', 'props': [
-            ('font-weight', 'bold'), ('text-align', 'center'),
-            ('background-color', '#a4c7b1'), ('color', 'black'),
-            ('font-size', font_size_responsive) # <-- Y aplicado aquí
-        ]},
-        {'selector': 'tbody tr:nth-child(even)', 'props': [('background-color', '#cce3d5')]}
-    ]).hide(axis="index")
-    
-    if currency_column and currency_column in df.columns:
-        styler = styler.format({currency_column: '${:,.0f}'})
-        
-    return styler
+    def figure(kind, show, builder):
+        return figure_cache.get_or_build(selected_area, f'{kind}:{view_key}', data_version, builder) if show else None
 
-# --- Main Dashboard ---
-# --- MODIFICACIÓN: Apuntamos al archivo CSV que subiste ---
-data_file = 'presupuesto2025.csv' 
-##arguments_file = 'expo.csv'
-logo_file = 'logo_floraica.png'
-background_image_file = 'flowers.png'
-##salaries_file = 'salarios.csv'
+    view = {
+        'ingresos_por_rubro': budget_analysis.breakdown_by_rubro(filtered_cube, 'Ingresos', top_n=6, value_column=measure),
+        'ingresos_por_area': budget_analysis.breakdown_by_area(filtered_cube, 'Ingresos', positive_rows_only=True, value_column=measure),
+        'egresos_por_rubro': budget_analysis.breakdown_by_rubro(filtered_cube, 'Egresos', top_n=5, value_column=measure),
+        'gastos_por_area': budget_analysis.breakdown_by_area(filtered_cube, 'Egresos', value_column=measure),
+    }
+    view['fig_ingresos'] = figure(
+        'ingresos_rubro', not view['ingresos_por_rubro'].empty and view['ingresos_por_rubro'][measure].sum() > 0,
+        lambda: budget_charts.build_rubro_pie(view['ingresos_por_rubro'], value_column=measure))
+    view['fig_ingresos_area'] = figure(
+        'ingresos_area', not view['ingresos_por_area'].empty,
+        lambda: budget_charts.build_area_bar(view['ingresos_por_area'], margin_bottom=0, value_column=measure))
+    view['fig_egresos'] = figure(
+        'egresos_rubro', not view['egresos_por_rubro'].empty and view['egresos_por_rubro'][measure].sum() > 0,
+        lambda: budget_charts.build_rubro_pie(view['egresos_por_rubro'], value_column=measure))
+    view['fig_gastos_area'] = figure(
+        'gastos_area', not view['gastos_por_area'].empty,
+        lambda: budget_charts.build_area_bar(view['gastos_por_area'], margin_bottom=25, value_column=measure))
+    return view
 
-inject_custom_css(background_image_file)
-df = load_data(data_file)
-##df_arguments = load_arguments_data(arguments_file)
-##df_salaries = load_salaries_data(salaries_file)
+def drilldown_root(selected_area):
+    # La vista "General" parte de todas las áreas; la de un área parte de sus rubros
+    return () if selected_area == "General" else (selected_area,)
 
-if not df.empty:
-    
-    # --- NUEVO: Filtro Avanzado Ceniflores ---
-    # 1. Identificar los ingresos de Ceniflores
-    mask_ceniflores_ingresos = (df['Area'] == 'Investigación y Desarrollo Floral') & (df['Tipo'] == 'Ingresos')
-    
-    # 2. Guardar estos ingresos por separado para uso futuro (como "información complementaria")
-    df_ceniflores_ingresos = df[mask_ceniflores_ingresos].copy()
-    total_ceniflores_ingresos = df_ceniflores_ingresos['Presupuesto 2025'].sum()
-    
-    # 3. Crear el DataFrame principal del dashboard excluyendo esos ingresos
-    # El operador ~ (tilde) invierte la máscara, seleccionando TODO MENOS los ingresos de Ceniflores
-    df_main = df[~mask_ceniflores_ingresos].copy()
-    
-    # NOTA: 'df' se usará para el filtro de sidebar y vistas detalladas.
-    # 'df_main' se usará para los KPIs y la vista "General".
-    
-    # --- Title and Logo Section ---
-    col1, col2 = st.columns([1, 4]) # Esta proporción se mantendrá, pero se apilará en móvil
-    with col1:
-        try:
-            st.image(logo_file, width=160)
-        except Exception:
-            st.warning(f"No se encontró el logo '{logo_file}'.")
-    with col2:
-        st.markdown("<h1 style='text-align: center; margin-top: -15px;'>PRESUPUESTO 2026</h1>", unsafe_allow_html=True)
+def build_drilldown_figure(children, level, selected_area, drill_tipo, path, measure, view_key, data_version, figure_cache):
+    """
+    Bar chart of the DRILLDOWN_TOP_N largest positive children of a node, or None.
+    """
+    positive_children = children[children[measure] > 0].head(DRILLDOWN_TOP_N)
+    if positive_children.empty:
+        return None
+    return figure_cache.get_or_build(
+        selected_area, f"drill:{drill_tipo}:{'|'.join(path)}:{view_key}", data_version,
+        lambda: budget_charts.build_children_bar(positive_children, level, value_column=measure))
 
-    # --- Sidebar and Filters ---
-    st.sidebar.header("Filtros")
-    
-    # --- MODIFICACIÓN: Usamos 'df' (el original) para asegurar que todas las áreas aparezcan en el filtro ---
-    all_areas = sorted(df['Area'].unique())
-    options_for_select = ["General"] + all_areas
+def load_view_pareto_table(data_file, data_version, dataset, measure, selected_sources):
+    if BACKEND == 'sqlite':
+        return load_sql_pareto_table(data_file, data_version, measure, selected_sources)
+    return load_pareto_table(dataset, data_version, measure, selected_sources)
 
-    selected_area = st.sidebar.selectbox(
-        "Seleccione un Área para ver el detalle",
-        options=options_for_select,
-        index=0 
-    )
+def pareto_view_table(pareto_table, selected_area, pareto_threshold, measure):
+    """
+    The Pareto table of a view ready for display: the area's CECOs, or every area's
+    CECOs in the "General" view. Returns (table name, frame).
+    """
+    if selected_area == "General":
+        rows = budget_analysis.pareto_all_areas(pareto_table, pareto_threshold, value_column=measure)
+        return 'pareto_all', rows.rename(columns={'Area': 'Área', measure: 'Monto (M)'})
+    rows = budget_analysis.pareto_for_area(pareto_table, selected_area, pareto_threshold, value_column=measure)
+    return 'pareto', rows.rename(columns={measure: 'Monto (M)'})
 
-    # --- Calculate Grand Totals ---
-    # --- MODIFICACIÓN: Usamos 'df_main' para los cálculos totales ---
-    total_ingresos = df_main[df_main['Tipo'] == 'Ingresos']['Presupuesto 2025'].sum()
-    total_egresos = df_main[df_main['Tipo'] == 'Egresos']['Presupuesto 2025'].sum()
-    resultado_neto = total_ingresos - total_egresos
+def load_view_variance_report(data_file, data_version, dataset, selected_sources):
+    if BACKEND == 'sqlite':
+        return load_sql_variance_report(data_file, data_version, selected_sources)
+    return load_variance_report(dataset, data_version, selected_sources)
 
-    # --- Display Grand Totals in KPIs ---
-    st.markdown("<h3 style='margin-top: -10px;'>TOTALES GENERALES (en millones de $)</h3>", unsafe_allow_html=True)
-    
-    kpi1, kpi2, kpi3 = st.columns(3) # Estas columnas se apilarán en móvil
-    with kpi1:
-        st.markdown(f"<p class='kpi-label'>INGRESOS TOTALES</p>", unsafe_allow_html=True)
-        # Este KPI ahora excluye los ingresos de Ceniflores
-        st.markdown(f"<p class='kpi-value'>{format_currency_millions(total_ingresos)}</p>", unsafe_allow_html=True)
-    with kpi2:
-        st.markdown(f"<p class='kpi-label'>EGRESOS TOTALES</p>", unsafe_allow_html=True)
-        st.markdown(f"<p class='kpi-value'>{format_currency_millions(total_egresos)}</p>", unsafe_allow_html=True)
-    with kpi3:
-        st.markdown(f"<p class='kpi-label'>RESULTADO NETO</p>", unsafe_allow_html=True)
-        # Este resultado también se ve afectado, ya que 'total_ingresos' cambió
-        st.markdown(f"<p class='kpi-value'>{format_currency_millions(resultado_neto)}</p>", unsafe_allow_html=True)
+# --- Background Warm-up (opcional: DASHBOARD_WARMUP=1) ---
+def warm_view(data_file, data_version, dataset, selected_area, measure, selected_sources, figure_cache):
+    """
+    Fills, for one entry of the area selector, the caches its first render reads:
+    breakdowns and figures, the drill-down root, the Pareto table (default threshold)
+    and the first page of its tables. Same functions and keys as render_area_detail.
+    """
+    view_key = view_key_for(measure, selected_sources)
+    cube = budget_analysis.filter_sources(load_aggregate_cube(data_file, data_version, measure), selected_sources)
+    view = build_view_breakdowns(budget_analysis.cube_for_view(cube, selected_area), selected_area, measure, view_key,
+                                 data_version, figure_cache)
+    for table, rows, shown in (('ingresos_rubro', view['ingresos_por_rubro'], view['fig_ingresos'] is not None),
+                               ('egresos_rubro', view['egresos_por_rubro'], view['fig_egresos'] is not None)):
+        if shown:
+            rows = rows.rename(columns={'Rubro': 'Categoría', measure: 'Monto (M)'})[['Categoría', 'Monto (M)']]
+            get_table_page_html(table, selected_area, data_version, view_key, 0, rows, MONEY_FORMATTERS)
 
-      
+    # El radio del drill-down arranca en 'Egresos'
+    path = drilldown_root(selected_area)
+    children = drilldown_children(data_file, data_version, dataset, measure, selected_sources, 'Egresos', path,
+                                  exclude_ceniflores_income=selected_area == "General")
+    if not children.empty:
+        level = budget_analysis.DRILLDOWN_LEVELS[len(path)]
+        build_drilldown_figure(children, level, selected_area, 'Egresos', path, measure, view_key, data_version, figure_cache)
+
+    pareto_threshold = budget_analysis.DEFAULT_PARETO_THRESHOLD
+    pareto_table = load_view_pareto_table(data_file, data_version, dataset, measure, selected_sources)
+    pareto_name, pareto_df = pareto_view_table(pareto_table, selected_area, pareto_threshold, measure)
+    if not pareto_df.empty:
+        get_table_page_html(pareto_name, selected_area, data_version, f"{view_key}|{pareto_threshold:.0%}", 0, pareto_df,
+                            MONEY_FORMATTERS)
+
+@st.cache_resource(max_entries=2)
+def start_warmup(data_file, data_version, options, measure, selected_sources, _dataset, _figure_cache):
+    """
+    Starts, once per dataset version, the background warm-up of every entry of the
+    area selector for the default measure and sources. Returns immediately: the
+    sessions keep being served while the pool works, and whatever is not warm yet
+    is simply computed on demand as before.
+    """
+    def shared():
+        # Lo que no depende del área: KPIs y reporte de ejecución
+        load_grand_totals(data_file, data_version, measure, selected_sources)
+        load_view_variance_report(data_file, data_version, _dataset, selected_sources)
+
+    tasks = [('(totales)', shared)] + [
+        (area, lambda area=area: warm_view(data_file, data_version, _dataset, area, measure, selected_sources, _figure_cache))
+        for area in options
+    ]
+    # Los hilos del pool no tienen contexto de sesión (ni lo necesitan): sin avisos por cada llamada cacheada
+    cache_warmup.quiet_logger('streamlit.runtime.scriptrunner_utils.script_run_context')
+    return cache_warmup.CacheWarmup(tasks, max_workers=cache_warmup.env_workers()).start()
+
+def render_warmup_status(warmup):
+    status = warmup.status()
+    if status['state'] == 'done':
+        st.sidebar.caption(f"Vistas precalculadas: {status['total']} en {status['seconds']:.1f} s")
+    else:
+        st.sidebar.caption(f"Preparando vistas en segundo plano: {status['done']}/{status['total']}")
+    if status['failed']:
+        st.sidebar.caption(f"No se pudieron precalcular: {', '.join(status['failed'])}")
+    return status
+
+# --- Payroll Tab ---
+def render_payroll(data_file, data_version, dataset, filtered_cube, measure, selected_sources, selected_area, variant):
+    """
+    Payroll from salarios.csv next to the 'Personal' budget: per area in the General
+    view, per CECO and employee in an area view. Only called when the tab is open,
+    so salarios.csv is not read until someone looks at it.
+    """
+    salaries_version = budget_data.dataset_version(salaries_file)
+    if salaries_version is None:
+        st.warning(f"Advertencia: No se encontró el archivo de salarios '{salaries_file}'. La pestaña 'Nómina' no tendrá datos.")
+        return
+    payroll = get_payroll_index(salaries_file, salaries_version)
+    if payroll is None:
+        st.info("No hay datos de salarios para mostrar.")
+        return
+
+    personal_budget = budget_analysis.personal_budget_by_area(filtered_cube)
+    money = {'Presupuesto Personal (M)': format_currency_millions, 'Nómina (M)': format_currency_millions}
+    if selected_area == "General":
+        comparison = payroll.compare_with_budget(personal_budget)
+        kpi1, kpi2, kpi3 = st.columns(3)
+        kpi1.metric("Presupuesto de Personal", format_currency_millions(comparison['Presupuesto Personal'].sum()))
+        kpi2.metric("Nómina (salarios)", format_currency_millions(comparison['Nómina'].sum()))
+        kpi3.metric("Personas", f"{comparison['Personas'].sum():,}".replace(',', '.'))
+        st.markdown("##### Nómina y presupuesto de Personal por Área (en millones de $)")
+        comparison = comparison.rename(columns={'Area': 'Área', 'Presupuesto Personal': 'Presupuesto Personal (M)', 'Nómina': 'Nómina (M)'})
+        show_table(comparison, 'payroll_by_area', selected_area, f"{data_version}|{salaries_version}", variant, money)
+        return
+
+    total, headcount = payroll.area_total(selected_area)
+    kpi1, kpi2, kpi3 = st.columns(3)
+    kpi1.metric("Presupuesto de Personal", format_currency_millions(personal_budget.get(selected_area, 0)))
+    kpi2.metric("Nómina (salarios)", format_currency_millions(total))
+    kpi3.metric("Personas", f"{headcount:,}".replace(',', '.'))
+
+    lines_col, employees_col = st.columns(2)
+    with lines_col:
+        st.markdown("##### Presupuesto de Personal por CECO (en millones de $)")
+        lines = drilldown_children(data_file, data_version, dataset, measure, selected_sources, 'Egresos',
+                                   (selected_area, budget_analysis.PAYROLL_RUBRO), False)
+        if lines.empty:
+            st.info("El área no tiene presupuesto en el rubro Personal.")
+        else:
+            show_table(lines.rename(columns={measure: 'Monto (M)'}), 'payroll_lines', selected_area, data_version, variant,
+                       {'Monto (M)': format_currency_millions})
+    with employees_col:
+        st.markdown("##### Salarios del área")
+        employees = payroll.area_employees(selected_area)
+        if employees.empty:
+            st.info("No hay salarios registrados para esta área.")
+        else:
+            show_table(employees, 'payroll_employees', selected_area, salaries_version, '', {'Salario': format_currency})
+
+# --- Arguments Tab ---
+def render_arguments(selected_area):
+    """
+    Arguments from expo.csv for the selected area (all of them in the General view),
+    grouped by 'Tipo Argumento'. Only called when the tab is open.
+    """
+    arguments_version = budget_data.dataset_version(arguments_file)
+    if arguments_version is None:
+        st.warning(f"Advertencia: No se encontró el archivo de argumentos '{arguments_file}'.")
+        return
+    df_arguments = load_arguments_data(arguments_file, arguments_version)
+    if df_arguments.empty or 'Area' not in df_arguments.columns:
+        st.info("No hay argumentos para mostrar.")
+        return
+
+    rows = df_arguments if selected_area == "General" else df_arguments[df_arguments['Area'] == selected_area]
+    if rows.empty:
+        st.info("No hay argumentos registrados para esta área.")
+    elif 'Texto Argumento' not in rows.columns:
+        show_table(rows, 'arguments', selected_area, arguments_version)
+    else:
+        group_column = 'Tipo Argumento' if 'Tipo Argumento' in rows.columns else 'Area'
+        for group, group_rows in rows.groupby(group_column, sort=False):
+            st.markdown(f"##### {group}")
+            prefix = group_rows['Area'] + ': ' if selected_area == "General" and group_column != 'Area' else ''
+            st.markdown('\n'.join(f"- {text}" for text in prefix + group_rows['Texto Argumento'].astype(str)))
+
+@st.fragment(key='area_detail')
+def render_area_detail(data_file, data_version, dataset, cube, measure, selected_sources, figure_cache, profiler):
+    """
+    Ingresos/egresos rows and the Pareto section for the selected area. The area and
+    Pareto threshold widgets rerun only this fragment, so the CSS, header and KPIs
+    (which do not depend on the area) are neither recomputed nor redrawn.
+    """
+    selected_area = st.session_state['selected_area']
+    pareto_threshold = st.session_state['pareto_threshold']
+    view_key = view_key_for(measure, selected_sources)
+    if profiler.recorded:
+        # Ejecución solo del fragmento: el perfil de la ejecución completa ya se registró
+        profiler = profiling.RerunProfiler(enabled=profiler.enabled, context={**profiler.context, 'rerun': 'fragment'})
+    profiler.context['selected_area'] = selected_area
 
-    
-    st.markdown("---")
-    
     # --- Filter data for the visual components ---
+    # La vista "General" usa el cubo sin ingresos Ceniflores; las vistas detalladas
+    # (incl. Ceniflores) usan todas las filas del área, con SUS ingresos y egresos.
+    filtered_cube = budget_analysis.cube_for_view(cube, selected_area)
+    view = build_view_breakdowns(filtered_cube, selected_area, measure, view_key, data_version, figure_cache)
     if selected_area == "General":
-        # --- MODIFICACIÓN: La vista "General" usa df_main (sin ingresos Ceniflores) ---
-        filtered_df = df_main.copy()
         st.subheader("Detalle General (en millones de $)")
     else:
-        # --- MODIFICACIÓN: Las vistas detalladas (incl. Ceniflores) usan el 'df' original ---
-        # Esto permite que al seleccionar "Ceniflores", se muestren SUS ingresos y egresos.
-        filtered_df = df[df['Area'] == selected_area]
         st.subheader(f"Detalle para: {selected_area} (en millones de $)")
 
-    green_color_scale = px.colors.sequential.YlGnBu
-
     # --- ROW 1: INGRESOS ---
     ing_left, ing_right = st.columns([1.2, 1])
     with ing_left:
         st.markdown("#### Detalle de Ingresos por Rubro")
-        df_ingresos = filtered_df[filtered_df['Tipo'] == 'Ingresos']
-        ingresos_por_rubro = df_ingresos.groupby('Rubro')['Presupuesto 2025'].sum().nlargest(6).reset_index()
-        if not ingresos_por_rubro.empty and ingresos_por_rubro['Presupuesto 2025'].sum() > 0:
+        if view['fig_ingresos'] is not None:
             pie_col, table_col = st.columns([3, 1.2]) # Columnas anidadas
             with pie_col:
-                ingresos_por_rubro['Rubro_wrapped'] = ingresos_por_rubro['Rubro'].apply(wrap_labels)
-                fig_ingresos = px.pie(ingresos_por_rubro, names='Rubro_wrapped', values='Presupuesto 2025', hole=0.5, color_discrete_sequence=green_color_scale)
-                
-                fig_ingresos.update_traces(textposition='outside', textinfo='percent+label', textfont=dict(color='white'))
-                
-                fig_ingresos.update_layout(
-                    margin=dict(t=80, b=80, l=40, r=40), 
-                    showlegend=False, 
-                    paper_bgcolor='rgba(0,0,0,0)', 
-                    plot_bgcolor='rgba(0,0,0,0)'
-                )
-                st.plotly_chart(fig_ingresos, use_container_width=True)
+                st.plotly_chart(view['fig_ingresos'], use_container_width=True)
             with table_col:
                 st.markdown("<div style='padding-top: 30px;'></div>", unsafe_allow_html=True)
-                ingresos_table = ingresos_por_rubro.copy()
-                ingresos_table['Monto (M)'] = ingresos_table['Presupuesto 2025'].apply(format_currency_millions)
-                ingresos_table.rename(columns={'Rubro': 'Categoría'}, inplace=True)
-                styled_ingresos = style_dataframe(ingresos_table[['Categoría', 'Monto (M)']])
-                st.markdown(styled_ingresos.to_html(), unsafe_allow_html=True)
+                ingresos_table = view['ingresos_por_rubro'].rename(columns={'Rubro': 'Categoría', measure: 'Monto (M)'})
+                show_table(ingresos_table[['Categoría', 'Monto (M)']], 'ingresos_rubro', selected_area, data_version, view_key,
+                           MONEY_FORMATTERS)
         else:
             st.info("No hay datos de ingresos por rubro para mostrar.")
 
     with ing_right:
         st.markdown("#### Detalle de Ingresos por Área")
-        df_ingresos_area = filtered_df[filtered_df['Tipo'] == 'Ingresos']
-        
-        # --- MODIFICACIÓN: Aseguramos que 'Area' esté presente antes de agrupar ---
-        if 'Area' in df_ingresos_area.columns:
-            ingresos_por_area = df_ingresos_area[df_ingresos_area['Presupuesto 2025'] > 0].groupby('Area')['Presupuesto 2025'].sum().sort_values(ascending=True).reset_index()
-            
-            if not ingresos_por_area.empty:
-                ingresos_por_area['Ppto_millones'] = ingresos_por_area['Presupuesto 2025'] / 1_000_000
-                ingresos_por_area['Ppto_millones_str'] = ingresos_por_area['Presupuesto 2025'].apply(format_currency_millions)
-                max_value_ing = ingresos_por_area['Ppto_millones'].max()
-                chart_height_ing = len(ingresos_por_area) * 35 + 60
-                fig_ingresos_area = px.bar(ingresos_por_area, x='Ppto_millones', y='Area', text='Ppto_millones_str', orientation='h', color_discrete_sequence=green_color_scale)
-                
-                fig_ingresos_area.update_traces(texttemplate='%{text}', textposition='outside', textfont=dict(color='white'))
-                
-                fig_ingresos_area.update_layout(
-                    xaxis=dict(showticklabels=False, showgrid=False, range=[0, max_value_ing * 1.25]),
-                    xaxis_title=None, yaxis_title=None, height=chart_height_ing,
-                    margin=dict(t=25, b=0, r=60), 
-                    yaxis=dict(tickfont=dict(color='white'), automargin=True),
-                    paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
-                
-                st.plotly_chart(fig_ingresos_area, use_container_width=True)
-            else:
-                st.info("No hay datos de ingresos por área para mostrar.")
+        if view['fig_ingresos_area'] is not None:
+            st.plotly_chart(view['fig_ingresos_area'], use_container_width=True)
         else:
-             st.info("No hay datos de ingresos por área para mostrar.")
+            st.info("No hay datos de ingresos por área para mostrar.")
 
     st.markdown("---")
 
+    profiler.lap('ingresos')
+
     # --- ROW 2: EGRESOS ---
     egr_left, egr_right = st.columns([1.2, 1])
     with egr_left:
         st.markdown("#### Detalle de Egresos por Rubro")
-        df_egresos = filtered_df[filtered_df['Tipo'] == 'Egresos']
-        egresos_por_rubro = df_egresos.groupby('Rubro')['Presupuesto 2025'].sum().nlargest(5).reset_index()
-        if not egresos_por_rubro.empty and egresos_por_rubro['Presupuesto 2025'].sum() > 0:
+        if view['fig_egresos'] is not None:
             pie_col, table_col = st.columns([3, 1.2]) # Columnas anidadas
             with pie_col:
-                egresos_por_rubro['Rubro_wrapped'] = egresos_por_rubro['Rubro'].apply(wrap_labels)
-                fig_egresos = px.pie(egresos_por_rubro, names='Rubro_wrapped', values='Presupuesto 2025', hole=0.5, color_discrete_sequence=green_color_scale)
-                
-                fig_egresos.update_traces(textposition='outside', textinfo='percent+label', textfont=dict(color='white'))
-                
-                fig_egresos.update_layout(
-                    margin=dict(t=80, b=80, l=40, r=40), 
-                    showlegend=False, 
-                    paper_bgcolor='rgba(0,0,0,0)', 
-                    plot_bgcolor='rgba(0,0,0,0)'
-                )
-                st.plotly_chart(fig_egresos, use_container_width=True)
+                st.plotly_chart(view['fig_egresos'], use_container_width=True)
             with table_col:
                 st.markdown("<div style='padding-top: 30px;'></div>", unsafe_allow_html=True)
-                egresos_table = egresos_por_rubro.copy()
-                egresos_table['Monto (M)'] = egresos_table['Presupuesto 2025'].apply(format_currency_millions)
-                egresos_table.rename(columns={'Rubro': 'Categoría'}, inplace=True)
-                styled_egresos = style_dataframe(egresos_table[['Categoría', 'Monto (M)']])
-                st.markdown(styled_egresos.to_html(), unsafe_allow_html=True)
+                egresos_table = view['egresos_por_rubro'].rename(columns={'Rubro': 'Categoría', measure: 'Monto (M)'})
+                show_table(egresos_table[['Categoría', 'Monto (M)']], 'egresos_rubro', selected_area, data_version, view_key,
+                           MONEY_FORMATTERS)
         else:
             st.info("No hay datos de egresos por rubro para mostrar.")
 
     with egr_right:
         st.markdown("#### Detalle de Egresos por Área")
-        df_egresos_area = filtered_df[filtered_df['Tipo'] == 'Egresos']
-        
-        # --- MODIFICACIÓN: Aseguramos que 'Area' esté presente antes de agrupar ---
-        if 'Area' in df_egresos_area.columns:
-            gastos_por_area = df_egresos_area.groupby('Area')['Presupuesto 2025'].sum().sort_values(ascending=True).reset_index()
-            gastos_por_area = gastos_por_area[gastos_por_area['Presupuesto 2025'] > 0]
-            
-            if not gastos_por_area.empty:
-                gastos_por_area['Ppto_millones'] = gastos_por_area['Presupuesto 2025'] / 1_000_000
-                gastos_por_area['Ppto_millones_str'] = gastos_por_area['Presupuesto 2025'].apply(format_currency_millions)
-                max_value_eg = gastos_por_area['Ppto_millones'].max()
-                chart_height_eg = len(gastos_por_area) * 35 + 60
-                fig_gastos_area = px.bar(gastos_por_area, x='Ppto_millones', y='Area', text='Ppto_millones_str', orientation='h', color_discrete_sequence=green_color_scale)
-                
-                fig_gastos_area.update_traces(texttemplate='%{text}', textposition='outside', textfont=dict(color='white'))
-                
-                fig_gastos_area.update_layout(
-                    xaxis=dict(showticklabels=False, showgrid=False, range=[0, max_value_eg * 1.25]),
-                    xaxis_title=dict(text=None, font=dict(color='white')), 
-                    yaxis_title=None, height=chart_height_eg,
-                    margin=dict(t=25, b=25, r=60),
-                    yaxis=dict(tickfont=dict(color='white'), automargin=True),
-                    paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
-                
-                st.plotly_chart(fig_gastos_area, use_container_width=True)
-            else:
-                st.info("No hay datos de egresos por área para mostrar.")
+        if view['fig_gastos_area'] is not None:
+            st.plotly_chart(view['fig_gastos_area'], use_container_width=True)
         else:
             st.info("No hay datos de egresos por área para mostrar.")
             
+    profiler.lap('egresos')
+
+    # --- DRILL-DOWN: Área → Rubro → CECO (solo se cargan los hijos del nodo expandido) ---
+    st.markdown("---")
+    st.markdown("#### Explorar por Área, Rubro y CECO")
+    level_labels = {'Area': 'Área', 'Rubro': 'Rubro', 'Nombre Ceco': 'CECO'}
+    selector_cols = st.columns(3)
+    with selector_cols[0]:
+        drill_tipo = st.radio("Tipo", ['Egresos', 'Ingresos'], horizontal=True, key='drill_tipo')
+    path = drilldown_root(selected_area)
+    while True:
+        level = budget_analysis.DRILLDOWN_LEVELS[len(path)]
+        children = drilldown_children(data_file, data_version, dataset, measure, selected_sources, drill_tipo, path,
+                                      exclude_ceniflores_income=selected_area == "General")
+        if level == budget_analysis.DRILLDOWN_LEVELS[-1] or children.empty:
+            break
+        with selector_cols[len(path) + (1 if selected_area == "General" else 0)]:
+            choice = st.selectbox(
+                f"Expandir {level_labels[level]}",
+                options=["(ninguno)"] + children[level].tolist(),
+                key=f"drill|{drill_tipo}|{'|'.join(path)}"
+            )
+        if choice == "(ninguno)":
+            break
+        path = path + (choice,)
+
+    st.markdown(f"##### {' › '.join([drill_tipo, *path])}: {level_labels[level]} (en millones de $)")
+    if not children.empty:
+        chart_col, table_col = st.columns([1.2, 1])
+        with chart_col:
+            fig_drill = build_drilldown_figure(children, level, selected_area, drill_tipo, path, measure, view_key, data_version, figure_cache)
+            if fig_drill is not None:
+                st.plotly_chart(fig_drill, use_container_width=True, key="drilldown_chart")
+        with table_col:
+            drill_table = children.rename(columns={level: level_labels[level], measure: 'Monto (M)'})
+            show_table(drill_table, 'drilldown', selected_area, data_version,
+                       f"{view_key}|{drill_tipo}|{'|'.join(path)}", MONEY_FORMATTERS)
+    else:
+        st.info("No hay datos para este nivel.")
+
+    profiler.lap('drilldown')
+
     # --- CONDITIONAL SECTIONS ---
+    pareto_table = load_view_pareto_table(data_file, data_version, dataset, measure, selected_sources)
+    pareto_name, pareto_df = pareto_view_table(pareto_table, selected_area, pareto_threshold, measure)
+    pareto_label = f"{pareto_threshold:.0%}"
+    st.markdown("---")
     if selected_area != "General":
-        st.markdown("---")
         st.subheader(f"Análisis de Pareto para: {selected_area}")
         
-        tab1 = st.tabs(["Análisis Pareto"])
+        tab_pareto, tab_variance, tab_payroll, tab_arguments = st.tabs(DETAIL_TABS, key='detail_tab', on_change='rerun')
         # --- Pareto Analysis Section ---
-        st.markdown("##### CECO's que Representan el 80% del Presupuesto por área (Egresos, Sin Nómina)")
-        pareto_result_df = perform_pareto_analysis(filtered_df)
-        if not pareto_result_df.empty:
-                pareto_result_df['Presupuesto 2025'] = pareto_result_df['Presupuesto 2025'].apply(format_currency_millions)
-                styled_pareto = style_dataframe(pareto_result_df.rename(columns={'Presupuesto 2025': 'Monto (M)'}))
-                st.markdown(styled_pareto.to_html(), unsafe_allow_html=True)
-        else:
-                st.info("No hay suficientes datos de egresos para realizar el análisis de Pareto en esta área.")
+        with tab_pareto:
+            st.markdown(f"##### CECO's que Representan el {pareto_label} del Presupuesto por área (Egresos, Sin Nómina)")
+            if not pareto_df.empty:
+                    show_table(pareto_df, pareto_name, selected_area, data_version, f"{view_key}|{pareto_label}", MONEY_FORMATTERS)
+            else:
+                    st.info("No hay suficientes datos de egresos para realizar el análisis de Pareto en esta área.")
+    else:
+        st.subheader("Análisis de Pareto: todas las áreas")
+
+        tab_pareto, tab_variance, tab_payroll, tab_arguments = st.tabs(DETAIL_TABS, key='detail_tab', on_change='rerun')
+        # --- Organization-wide Pareto: los CECOs Pareto de cada área en una sola tabla ---
+        with tab_pareto:
+            st.markdown(f"##### CECO's que Representan el {pareto_label} del Presupuesto de cada área (Egresos, Sin Nómina)")
+            if not pareto_df.empty:
+                with st.expander(f"Ver {len(pareto_df)} CECOs Pareto de todas las áreas"):
+                    show_table(pareto_df, pareto_name, selected_area, data_version, f"{view_key}|{pareto_label}", MONEY_FORMATTERS)
+            else:
+                st.info("No hay suficientes datos de egresos para realizar el análisis de Pareto.")
+
+    profiler.lap('pareto')
+
+    # --- Variance Section: ejecución vs presupuesto y crecimiento 2025 → 2026 ---
+    with tab_variance:
+        variance_report = load_view_variance_report(data_file, data_version, dataset, selected_sources)
+        render_variance(variance_report, selected_area, data_version, view_key)
+
+    profiler.lap('variance')
+
+    # --- Payroll and Arguments: se leen (y se cachean) solo al abrir su pestaña ---
+    if tab_payroll.open:
+        with tab_payroll:
+            render_payroll(data_file, data_version, dataset, filtered_cube, measure, selected_sources, selected_area, view_key)
+        profiler.lap('payroll')
+    if tab_arguments.open:
+        with tab_arguments:
+            render_arguments(selected_area)
+        profiler.lap('arguments')
+
+    render_profile_panel(profiler, data_file, dataset)
+
+# --- Profiling Panel ---
+def render_profile_panel(profiler, data_file, dataset=None):
+    """
+    Shows the section timings in the sidebar and appends them to the profile log,
+    with the memory footprint of the shared dataset.
+    """
+    if not profiler.enabled:
+        return
+    profiler.context['data_file'] = data_file
+    if dataset is not None:
+        profiler.context['dataset'] = dataset.memory_usage()
+    profile_record = profiler.record()
+    profiler.append_log(profile_record)
+    with st.sidebar.expander(f"Perfil de la ejecución ({profile_record['total_ms']:.0f} ms)"):
+        st.table(pd.DataFrame(
+            {'ms': list(profile_record['sections_ms'].values())},
+            index=list(profile_record['sections_ms'].keys())
+        ))
+        st.json({'cache': profile_record['cache'], 'cache_totals': profile_record['cache_totals'], 'figure_cache': get_figure_cache().stats(),
+                 'dataset': profile_record.get('dataset'), 'warmup': profile_record.get('warmup')})
+
+# --- Main Dashboard ---
+# --- MODIFICACIÓN: Apuntamos al archivo CSV que subiste ---
+# PRESUPUESTO_DIR: carpeta con varios CSV (uno por año, entidad o revisión)
+data_file = os.environ.get('PRESUPUESTO_DIR') or os.environ.get('PRESUPUESTO_FILE', 'presupuesto2025.csv')
+arguments_file = 'expo.csv'
+logo_file = 'logo_floraica.png'
+background_image_file = 'flowers.png'
+salaries_file = 'salarios.csv'
+# PRESUPUESTO_BACKEND: 'pandas' (por defecto, todo en memoria) o 'sqlite' (consultas sobre un archivo local)
+BACKEND = budget_store.selected_backend()
+
+# --- Perfil por sección (opcional: ?profile=1 o DASHBOARD_PROFILE=1) ---
+profiler = profiling.RerunProfiler(enabled=profiling.env_enabled() or st.query_params.get('profile') == '1')
+
+inject_custom_css(background_image_file)
+profiler.lap('css')
+data_version = budget_data.dataset_version(data_file)
+if BACKEND == 'sqlite':
+    dataset = None
+    dataset_info = profiler.cached_call('load_data', load_store_info, data_file, data_version)
+else:
+    # Un solo dataset de solo lectura por versión, compartido por todas las sesiones
+    dataset = profiler.cached_call('load_data', load_data, data_file, data_version)
+    # Las cachés siguientes se indexan con la versión de los datos realmente cargados
+    data_version = dataset.version
+    dataset_info = dataset.info
+profiler.lap('load_data')
+# expo.csv y salarios.csv se leen solo al abrir las pestañas "Argumentos" y "Nómina"
+
+if dataset_info is not None:
+    
+    # --- Title and Logo Section ---
+    col1, col2 = st.columns([1, 4]) # Esta proporción se mantendrá, pero se apilará en móvil
+    with col1:
+        try:
+            st.image(logo_file, width=160)
+        except Exception:
+            st.warning(f"No se encontró el logo '{logo_file}'.")
+    with col2:
+        st.markdown("<h1 style='text-align: center; margin-top: -15px;'>PRESUPUESTO 2026</h1>", unsafe_allow_html=True)
+
+    # --- Sidebar and Filters ---
+    st.sidebar.header("Filtros")
+    
+    # --- MODIFICACIÓN: Usamos 'df' (el original) para asegurar que todas las áreas aparezcan en el filtro ---
+    all_areas = dataset_info['areas']
+    options_for_select = ["General"] + all_areas
+
+    selected_area = st.sidebar.selectbox(
+        "Seleccione un Área para ver el detalle",
+        options=options_for_select,
+        index=0,
+        key='selected_area',
+        on_change=lambda: st.rerun('area_detail')
+    )
+
+    # --- Medida: cualquier columna de dinero del CSV, sin recargar los datos ---
+    measure = st.sidebar.selectbox(
+        "Columna a analizar",
+        options=dataset_info['measures'],
+        index=0
+    )
+
+    # --- Fuentes: con una carpeta de presupuestos se elige qué años/entidades combinar ---
+    all_sources = dataset_info['sources']
+    selected_sources = ()
+    if all_sources:
+        selected_sources = tuple(st.sidebar.multiselect(
+            "Presupuestos (año / entidad)",
+            options=all_sources,
+            default=all_sources
+        ))
+        if not selected_sources:
+            st.sidebar.warning("Seleccione al menos un presupuesto; se muestran todos.")
+
+    # --- Líneas del CSV rechazadas en la carga por bloques (quedan en cuarentena) ---
+    ingest_report = dataset_info.get('ingest')
+    if ingest_report and ingest_report['skipped_rows']:
+        skipped = f"{ingest_report['skipped_rows']:,}".replace(',', '.')
+        st.sidebar.warning(f"Se omitieron {skipped} filas mal formadas del CSV. "
+                           f"Están en {ingest_report['quarantine_file']} con su número de línea.")
+
+    # El área y el umbral solo afectan al detalle por área (ver render_area_detail)
+    st.sidebar.select_slider(
+        "Umbral del análisis de Pareto",
+        options=list(budget_analysis.PARETO_THRESHOLDS),
+        value=budget_analysis.DEFAULT_PARETO_THRESHOLD,
+        format_func=lambda t: f"{t:.0%}",
+        key='pareto_threshold',
+        on_change=lambda: st.rerun('area_detail')
+    )
+
+    # --- Estadísticas de la caché de gráficos (solo con ?cache_stats=1 en la URL) ---
+    figure_cache = get_figure_cache()
+    if st.query_params.get('cache_stats'):
+        with st.sidebar.expander("Caché de gráficos"):
+            st.json(figure_cache.stats())
+
+    # --- Precálculo en segundo plano de todas las vistas (solo con DASHBOARD_WARMUP=1) ---
+    # Una vez por versión del dataset, con la medida y las fuentes por defecto; no bloquea esta ejecución
+    if cache_warmup.env_enabled():
+        warmup = start_warmup(data_file, data_version, tuple(options_for_select), dataset_info['measures'][0],
+                              tuple(all_sources), dataset, figure_cache)
+        warmup_status = render_warmup_status(warmup)
+        profiler.context['warmup'] = {key: warmup_status[key] for key in ('state', 'done', 'total', 'seconds', 'failed')}
+
+    # --- Cubo de agregados (Area, Tipo, Rubro), calculado una vez por versión del dataset y medida ---
+    cube = budget_analysis.filter_sources(load_aggregate_cube(data_file, data_version, measure), selected_sources)
+
+    # NOTA: 'dataset' se usará para la tabla de Pareto (con el backend SQL no se carga).
+
+    profiler.context.update({'selected_area': selected_area, 'measure': measure, 'sources': list(selected_sources)})
+    profiler.lap('setup')
+
+    # --- Calculate Grand Totals (no dependen del área: una vez por versión, medida y fuentes) ---
+    total_ingresos, total_egresos, resultado_neto = load_grand_totals(data_file, data_version, measure, selected_sources)
+
+    # --- Display Grand Totals in KPIs ---
+    st.markdown("<h3 style='margin-top: -10px;'>TOTALES GENERALES (en millones de $)</h3>", unsafe_allow_html=True)
+    
+    kpi1, kpi2, kpi3 = st.columns(3) # Estas columnas se apilarán en móvil
+    with kpi1:
+        st.markdown(f"<p class='kpi-label'>INGRESOS TOTALES</p>", unsafe_allow_html=True)
+        # Este KPI ahora excluye los ingresos de Ceniflores
+        st.markdown(f"<p class='kpi-value'>{format_currency_millions(total_ingresos)}</p>", unsafe_allow_html=True)
+    with kpi2:
+        st.markdown(f"<p class='kpi-label'>EGRESOS TOTALES</p>", unsafe_allow_html=True)
+        st.markdown(f"<p class='kpi-value'>{format_currency_millions(total_egresos)}</p>", unsafe_allow_html=True)
+    with kpi3:
+        st.markdown(f"<p class='kpi-label'>RESULTADO NETO</p>", unsafe_allow_html=True)
+        # Este resultado también se ve afectado, ya que 'total_ingresos' cambió
+        st.markdown(f"<p class='kpi-value'>{format_currency_millions(resultado_neto)}</p>", unsafe_allow_html=True)
+
+    profiler.lap('kpis')
+
+      
+
+    
+    st.markdown("---")
+    
+    # --- Detalle por área: se vuelve a ejecutar solo este fragmento al cambiar de área o de umbral ---
+    render_area_detail(data_file, data_version, dataset, cube, measure, selected_sources, figure_cache, profiler)
 
 else:
-    st.error("No se pudieron cargar los datos. Revisa el nombre del archivo 'presupuesto20251.csv' y su contenido.")
\ No newline at end of file
+    st.error("No se pudieron cargar los datos. Revisa el nombre del archivo 'presupuesto20251.csv' y su contenido.")
+
+# --- Panel de perfil y registro estructurado (si el fragmento no lo mostró ya) ---
+if not profiler.recorded:
+    render_profile_panel(profiler, data_file, dataset)
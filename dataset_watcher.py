@@ -0,0 +1,222 @@
+# dataset_watcher.py
+
+import io
+import os
+import threading
+
+import budget_analysis
+import budget_data
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # Sin watchdog el cambio se detecta por mtime en cada ejecución
+    FileSystemEventHandler = object
+    Observer = None
+
+
+class VersionChangedError(RuntimeError):
+    """
+    Raised when a caller asks for a version of the CSV that is no longer the loaded one.
+    """
+    def __init__(self, requested, current):
+        super().__init__(f"Se pidió la versión {requested} pero la cargada es {current}")
+        self.requested = requested
+        self.current = current
+
+
+class DatasetWatcher:
+    """
+    Keeps the cleaned frame of one budget CSV and its aggregate cubes up to date.
+
+    A change is detected by (size, mtime) on every refresh() and, when watchdog is
+    available, eagerly through filesystem events. If the new file only appends rows
+    to the previous one (same leading bytes), only the tail is parsed and merged into
+    the frame and the cubes; any other change triggers a full reload. With
+    PRESUPUESTO_INGEST=stream a full reload is a streaming ingest (see
+    budget_data.load_budget_streaming) and its report is kept in ingest_report; the
+    appended rows then go through the same quarantine and are added to the report.
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.version = None
+        self.df = None
+        self.last_reload = None  # 'full' | 'append'
+        self.ingest_report = None
+        self._size = 0
+        self._hash = None
+        self._header = b""
+        self._line_count = None  # Líneas del CSV ya cargado; se cuentan al primer append en modo 'stream'
+        self._cubes = {}
+        self._lock = threading.RLock()
+        self._observer = None
+
+    # --- Refresh ---
+    def refresh(self):
+        """
+        Returns (version, frame), reloading first if the file changed.
+        """
+        with self._lock:
+            version = budget_data.dataset_version(self.file_path)
+            if version is None:
+                raise FileNotFoundError(self.file_path)
+            if version != self.version or self.df is None:
+                self._reload(version)
+            return self.version, self.df
+
+    def _reload(self, version):
+        size = os.path.getsize(self.file_path)
+        tail = self._read_appended_tail(size) if self.df is not None else None
+
+        if tail is not None:
+            if budget_data.selected_ingest_mode() == 'stream' and self.ingest_report is not None:
+                appended = self._stream_append(tail)
+            else:
+                appended = budget_data.clean_budget_frame(budget_data.read_budget_csv(io.BytesIO(self._header + tail)))
+            if appended is not None:
+                self.df = budget_data.concat_budget_frames([self.df, appended])
+                for measure, cube in self._cubes.items():
+                    self._cubes[measure] = budget_analysis.merge_cubes(
+                        [cube, budget_analysis.build_aggregate_cube(appended, measure)])
+            budget_data.save_sidecar(self.df, self.file_path, self.ingest_report)
+            self.last_reload = 'append'
+        elif budget_data.selected_ingest_mode() == 'stream':
+            self.df, self._cubes, self.ingest_report = self._stream_load()
+            self._line_count = None
+            self.last_reload = 'full'
+        else:
+            self.df = budget_data.load_budget(self.file_path)
+            self._cubes = {}
+            self.last_reload = 'full'
+
+        self.version = version
+        self._size = size
+        self._hash = budget_data.file_fingerprint(self.file_path)['hash']
+        with open(self.file_path, 'rb') as f:
+            self._header = f.readline()
+
+    def _stream_load(self):
+        """
+        Streaming ingest: each chunk is folded into the running cube of every money
+        column while it is written to the sidecar, so the cubes need no pass over the
+        frame. Returns (frame, cubes, report); the cubes are empty if the sidecar was fresh.
+        """
+        cubes = {}
+
+        def fold(chunk):
+            for measure in budget_data.money_columns(chunk):
+                cube = budget_analysis.build_aggregate_cube(chunk, measure)
+                cubes[measure] = budget_analysis.merge_cubes([cubes[measure], cube]) if measure in cubes else cube
+
+        df, report = budget_data.load_budget_streaming(self.file_path, on_chunk=fold)
+        return df, cubes, report
+
+    def _stream_append(self, tail):
+        """
+        Parses the appended rows like a streaming load: malformed lines go to the
+        quarantine file with their line number in the whole CSV, and ingest_report is
+        updated. Returns the cleaned new rows, or None if none of them was valid.
+        """
+        if self._line_count is None:
+            self._line_count = budget_data.count_lines(self.file_path, limit=self._size)
+        # El búfer empieza con el encabezado (su línea 1): su línea 2 es la línea _line_count + 1 del CSV
+        quarantine = budget_data.BadLineQuarantine(
+            budget_data.quarantine_path(self.file_path), line_offset=self._line_count - 1, append=True)
+        try:
+            chunks = list(budget_data.iter_budget_chunks(io.BytesIO(self._header + tail), quarantine=quarantine))
+        except BaseException:
+            quarantine.discard()
+            raise
+        quarantine_file = quarantine.close()
+        self._line_count += tail.count(b"\n")
+
+        chunks = [chunk for chunk in chunks if not chunk.empty]
+        report = self.ingest_report
+        self.ingest_report = {
+            'rows': report['rows'] + sum(len(chunk) for chunk in chunks),
+            'skipped_rows': report['skipped_rows'] + quarantine.count,
+            'chunks': report['chunks'] + len(chunks),
+            'quarantine_file': quarantine_file or report['quarantine_file'],
+        }
+        return budget_data.concat_budget_frames(chunks) if chunks else None
+
+    def _read_appended_tail(self, size):
+        """
+        The bytes appended since the last load, or None if the change is not a pure
+        append (file shrank, leading bytes changed, or the previous content did not
+        end on a complete line).
+        """
+        if size <= self._size or self._hash is None:
+            return None
+        with open(self.file_path, 'rb') as f:
+            f.seek(self._size - 1)
+            if f.read(1) != b"\n":
+                return None
+            tail = f.read()
+        if budget_data.file_hash(self.file_path, limit=self._size) != self._hash:
+            return None
+        return tail
+
+    # --- Derived Aggregates ---
+    def aggregate_cube(self, version, value_column=budget_data.BUDGET_COLUMN):
+        """
+        Aggregate cube of 'version', maintained incrementally across appends. Raises
+        VersionChangedError if the CSV changed again and that version is gone.
+        """
+        with self._lock:
+            if version != self.version:
+                self.refresh()
+            if version != self.version:
+                raise VersionChangedError(version, self.version)
+            if value_column not in self._cubes:
+                self._cubes[value_column] = budget_analysis.build_aggregate_cube(self.df, value_column)
+            return self._cubes[value_column]
+
+    # --- Filesystem Events ---
+    def start(self):
+        """
+        Starts a watchdog observer that refreshes as soon as the CSV changes, so the
+        next rerun finds the new version already loaded. No-op without watchdog.
+        """
+        if Observer is None or self._observer is not None:
+            return
+        handler = _FileChangeHandler(self)
+        observer = Observer()
+        observer.daemon = True
+        observer.schedule(handler, os.path.dirname(os.path.abspath(self.file_path)) or '.', recursive=False)
+        observer.start()
+        self._observer = observer
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+
+class _FileChangeHandler(FileSystemEventHandler):
+    """
+    Refreshes the watcher once the CSV has been quiet for DEBOUNCE_SECONDS, so a file
+    written in many chunks is parsed once and not on every write event.
+    """
+    DEBOUNCE_SECONDS = 1.0
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+        self.target = os.path.abspath(watcher.file_path)
+        self._timer = None
+
+    def on_any_event(self, event):
+        paths = {getattr(event, 'src_path', None), getattr(event, 'dest_path', None)}
+        if self.target not in {os.path.abspath(p) for p in paths if p}:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.DEBOUNCE_SECONDS, self._refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _refresh(self):
+        try:
+            self.watcher.refresh()
+        except Exception:
+            pass  # Archivo a medio escribir: la siguiente ejecución lo vuelve a intentar
@@ -0,0 +1,285 @@
+# export_snapshot.py
+
+"""
+Renders the General view and every area view of the dashboard into static HTML
+pages, so read-only users can open the budget from a plain file server.
+
+    python export_snapshot.py --output snapshot
+    python export_snapshot.py --file presupuesto2025.csv --measure "Presupuesto 2026" --workers 4
+"""
+
+import argparse
+import datetime
+import html
+import os
+import re
+import shutil
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly.offline
+
+import budget_analysis
+import budget_charts
+import budget_data
+import static_assets
+from budget_charts import format_currency_millions, render_table_html
+
+LOGO_FILE = 'logo_floraica.png'
+BACKGROUND_IMAGE_FILE = 'flowers.png'
+PLOTLY_JS = 'plotly.min.js'
+
+# --- Page Style ---
+# Mismo aspecto que inject_custom_css en dashboard.py: fondo con flores, texto blanco,
+# KPIs grandes y columnas que se apilan en móvil.
+PAGE_CSS = """
+body { margin: 0; font-family: "Source Sans Pro", sans-serif; }
+.stApp { min-height: 100vh; padding: 1.5rem 3rem; box-sizing: border-box;
+         background-size: cover; background-repeat: no-repeat; background-attachment: fixed; }
+.stApp, .stApp h1, .stApp h3, .stApp h4, .stApp h5, .stApp a { color: white; }
+h1 { font-size: clamp(2.2rem, 5vw, 3rem); text-align: center; margin: 0; }
+h3 { font-size: clamp(1.2rem, 3vw, 1.5rem); }
+h4 { font-size: clamp(1rem, 2.5vw, 1.25rem); }
+.kpi-label { font-size: clamp(1rem, 2.5vw, 1.5rem); font-weight: 700; margin-bottom: -10px; }
+.kpi-value { font-size: clamp(1.5rem, 4vw, 2.2rem); font-weight: 800; }
+.row { display: flex; gap: 1rem; align-items: flex-start; }
+.col { min-width: 0; }
+.header { align-items: center; }
+nav { margin: 1rem 0; line-height: 1.8; }
+nav a { margin-right: 1rem; white-space: nowrap; }
+nav a.current { font-weight: 700; text-decoration: none; }
+.info { background: rgba(28, 131, 225, 0.25); border-radius: 0.5rem; padding: 0.75rem 1rem; }
+details summary { cursor: pointer; margin-bottom: 0.5rem; }
+footer { margin-top: 2rem; opacity: 0.8; font-size: 0.85rem; }
+hr { border: none; border-top: 1px solid rgba(255, 255, 255, 0.3); margin: 1.5rem 0; }
+@media (max-width: 768px) {
+    .stApp { padding: 1rem; }
+    .row { flex-direction: column; align-items: stretch; }
+    .col { width: 100% !important; }
+    .header img { width: 150px; }
+}
+"""
+
+# Estado de cada proceso del pool, cargado una sola vez por el initializer
+_context = {}
+
+
+# --- Helper Functions ---
+def page_name(area):
+    """
+    File name of a view: index.html for "General", an ASCII slug for each area.
+    """
+    if area == "General":
+        return 'index.html'
+    ascii_name = unicodedata.normalize('NFKD', area).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '-', ascii_name.lower()).strip('-') + '.html'
+
+
+def _columns(*cells, weights):
+    """
+    Equivalent of st.columns: a flex row whose cells share the width by 'weights'.
+    """
+    total = sum(weights)
+    return '<div class="row">' + ''.join(
+        f'<div class="col" style="width: {weight / total:.2%};">{cell}</div>' for cell, weight in zip(cells, weights)
+    ) + '</div>'
+
+
+def _info(message):
+    return f'<div class="info">{html.escape(message)}</div>'
+
+
+def _figure(fig):
+    return fig.to_html(full_html=False, include_plotlyjs=False, config={'responsive': True})
+
+
+def _rubro_block(cube_view, tipo, top_n, measure):
+    title = f"<h4>Detalle de {tipo} por Rubro</h4>"
+    por_rubro = budget_analysis.breakdown_by_rubro(cube_view, tipo, top_n=top_n, value_column=measure)
+    if por_rubro.empty or por_rubro[measure].sum() <= 0:
+        return title + _info(f"No hay datos de {tipo.lower()} por rubro para mostrar.")
+    table = por_rubro.copy()
+    table['Monto (M)'] = table[measure].apply(format_currency_millions)
+    table = table.rename(columns={'Rubro': 'Categoría'})
+    table_html = '<div style="padding-top: 30px;"></div>' + render_table_html(table[['Categoría', 'Monto (M)']])
+    return title + _columns(_figure(budget_charts.build_rubro_pie(por_rubro, value_column=measure)), table_html, weights=[3, 1.2])
+
+
+def _area_block(cube_view, tipo, measure, positive_rows_only=False, margin_bottom=0):
+    title = f"<h4>Detalle de {tipo} por Área</h4>"
+    por_area = budget_analysis.breakdown_by_area(cube_view, tipo, positive_rows_only=positive_rows_only, value_column=measure)
+    if por_area.empty:
+        return title + _info(f"No hay datos de {tipo.lower()} por área para mostrar.")
+    return title + _figure(budget_charts.build_area_bar(por_area, margin_bottom=margin_bottom, value_column=measure))
+
+
+def _pareto_section(area, pareto_table, threshold, measure):
+    label = f"{threshold:.0%}"
+    if area != "General":
+        parts = [
+            f"<h3>Análisis de Pareto para: {html.escape(area)}</h3>",
+            f"<h5>CECO's que Representan el {label} del Presupuesto por área (Egresos, Sin Nómina)</h5>",
+        ]
+        pareto_df = budget_analysis.pareto_for_area(pareto_table, area, threshold, value_column=measure)
+        if pareto_df.empty:
+            return ''.join(parts) + _info("No hay suficientes datos de egresos para realizar el análisis de Pareto en esta área.")
+        pareto_df[measure] = pareto_df[measure].apply(format_currency_millions)
+        return ''.join(parts) + render_table_html(pareto_df.rename(columns={measure: 'Monto (M)'}))
+
+    parts = [
+        "<h3>Análisis de Pareto: todas las áreas</h3>",
+        f"<h5>CECO's que Representan el {label} del Presupuesto de cada área (Egresos, Sin Nómina)</h5>",
+    ]
+    pareto_df = budget_analysis.pareto_all_areas(pareto_table, threshold, value_column=measure)
+    if pareto_df.empty:
+        return ''.join(parts) + _info("No hay suficientes datos de egresos para realizar el análisis de Pareto.")
+    pareto_df[measure] = pareto_df[measure].apply(format_currency_millions)
+    table_html = render_table_html(pareto_df.rename(columns={'Area': 'Área', measure: 'Monto (M)'}))
+    return ''.join(parts) + f"<details><summary>Ver {len(pareto_df)} CECOs Pareto de todas las áreas</summary>{table_html}</details>"
+
+
+# --- Page Rendering ---
+def _init_worker(context):
+    _context.update(context)
+
+
+def render_view(area):
+    """
+    Writes the page of one view ("General" or an area) with the same sections as the
+    dashboard, and returns its file name. Runs inside a pool worker.
+    """
+    ctx = _context
+    measure = ctx['measure']
+    cube_view = budget_analysis.cube_for_view(ctx['cube'], area)
+    total_ingresos, total_egresos, resultado_neto = ctx['totals']
+
+    nav = ''.join(
+        f'<a href="{page_name(option)}"{" class=current" if option == area else ""}>{html.escape(option)}</a>'
+        for option in ["General"] + ctx['areas']
+    )
+    kpis = _columns(*[
+        f"<p class='kpi-label'>{label}</p><p class='kpi-value'>{format_currency_millions(value)}</p>"
+        for label, value in [('INGRESOS TOTALES', total_ingresos), ('EGRESOS TOTALES', total_egresos), ('RESULTADO NETO', resultado_neto)]
+    ], weights=[1, 1, 1])
+    detail_title = "Detalle General (en millones de $)" if area == "General" else f"Detalle para: {html.escape(area)} (en millones de $)"
+
+    body = [
+        _columns(f'<img src="{LOGO_FILE}" width="160">' if ctx['has_logo'] else '',
+                 "<h1>PRESUPUESTO 2026</h1>", weights=[1, 4]).replace('class="row"', 'class="row header"', 1),
+        f"<nav>{nav}</nav>",
+        "<h3>TOTALES GENERALES (en millones de $)</h3>",
+        kpis,
+        "<hr>",
+        f"<h3>{detail_title}</h3>",
+        _columns(_rubro_block(cube_view, 'Ingresos', 6, measure),
+                 _area_block(cube_view, 'Ingresos', measure, positive_rows_only=True), weights=[1.2, 1]),
+        "<hr>",
+        _columns(_rubro_block(cube_view, 'Egresos', 5, measure),
+                 _area_block(cube_view, 'Egresos', measure, margin_bottom=25), weights=[1.2, 1]),
+        "<hr>",
+        _pareto_section(area, ctx['pareto_table'], ctx['threshold'], measure),
+        f"<footer>{html.escape(ctx['footer'])}</footer>",
+    ]
+
+    page = f"""<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Presupuesto 2026 - {html.escape(area)}</title>
+<script src="{PLOTLY_JS}"></script>
+<style>{PAGE_CSS}{budget_charts.TABLE_CSS}
+{ctx['background_css']}</style>
+</head>
+<body><div class="stApp">
+{''.join(body)}
+</div></body>
+</html>
+"""
+    name = page_name(area)
+    with open(os.path.join(ctx['output_dir'], name), 'w', encoding='utf-8') as f:
+        f.write(page)
+    return name
+
+
+# --- Export ---
+def _background_css(output_dir, image_file):
+    if not os.path.exists(image_file):
+        return ''
+    urls = static_assets.build_image_variants(image_file, static_dir=os.path.join(output_dir, 'static'), static_url='static')
+    if urls is not None:
+        return static_assets.background_css(urls)
+    return f'.stApp {{ background-image: url("{static_assets.encode_data_uri(image_file)}"); }}'
+
+
+def export_snapshot(data_file, output_dir, measure=budget_data.BUDGET_COLUMN, threshold=budget_analysis.DEFAULT_PARETO_THRESHOLD,
+                    sources=(), workers=None, logo_file=LOGO_FILE, background_file=BACKGROUND_IMAGE_FILE):
+    """
+    Loads the budget once, computes the cube, KPIs and Pareto table, then renders
+    every view in parallel. Returns the list of written pages.
+    """
+    df = budget_data.load_budget_dir(data_file) if os.path.isdir(data_file) else budget_data.load_budget(data_file)
+    df = budget_analysis.filter_sources(df, sources)
+    if measure not in budget_data.money_columns(df):
+        raise ValueError(f"La columna '{measure}' no está en los datos: {', '.join(budget_data.money_columns(df))}")
+
+    cube = budget_analysis.build_aggregate_cube(df, measure)
+    cube_main = budget_analysis.cube_for_view(cube, "General")
+    total_ingresos = budget_analysis.total_by_tipo(cube_main, 'Ingresos')
+    total_egresos = budget_analysis.total_by_tipo(cube_main, 'Egresos')
+    areas = sorted(df['Area'].unique().astype(str))
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, PLOTLY_JS), 'w', encoding='utf-8') as f:
+        f.write(plotly.offline.get_plotlyjs())
+    has_logo = os.path.exists(logo_file)
+    if has_logo:
+        shutil.copyfile(logo_file, os.path.join(output_dir, LOGO_FILE))
+
+    generated = datetime.datetime.now().strftime('%Y-%m-%d %H:%M')
+    context = {
+        'output_dir': output_dir,
+        'measure': measure,
+        'threshold': threshold,
+        'cube': cube,
+        'pareto_table': budget_analysis.build_pareto_table(df, value_column=measure),
+        'totals': (total_ingresos, total_egresos, total_ingresos - total_egresos),
+        'areas': areas,
+        'has_logo': has_logo,
+        'background_css': _background_css(output_dir, background_file),
+        'footer': f"Generado el {generated} a partir de {os.path.basename(os.path.normpath(data_file))} "
+                  f"(versión {budget_data.dataset_version(data_file)}) · {measure}",
+    }
+    del df  # Los procesos solo reciben el cubo y la tabla de Pareto, no el presupuesto completo
+
+    views = ["General"] + areas
+    workers = min(len(views), workers or os.cpu_count() or 1)
+    if workers == 1:
+        _init_worker(context)
+        return [render_view(area) for area in views]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(context,)) as pool:
+        return list(pool.map(render_view, views))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta el dashboard de presupuesto como páginas HTML estáticas")
+    parser.add_argument('--file', default=os.environ.get('PRESUPUESTO_DIR') or os.environ.get('PRESUPUESTO_FILE', 'presupuesto2025.csv'),
+                        help="CSV de presupuesto o carpeta con varios CSV")
+    parser.add_argument('--output', default='snapshot', help="Carpeta de salida")
+    parser.add_argument('--measure', default=budget_data.BUDGET_COLUMN, help="Columna a analizar")
+    parser.add_argument('--threshold', type=float, default=budget_analysis.DEFAULT_PARETO_THRESHOLD,
+                        choices=budget_analysis.PARETO_THRESHOLDS, help="Umbral del análisis de Pareto")
+    parser.add_argument('--sources', default='', help="Presupuestos a combinar, separados por coma (por defecto todos)")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos en paralelo (por defecto uno por CPU)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    sources = tuple(source for source in args.sources.split(',') if source)
+    pages = export_snapshot(args.file, args.output, measure=args.measure, threshold=args.threshold,
+                            sources=sources, workers=args.workers)
+    print(f"{len(pages)} páginas en {args.output}/ ({time.perf_counter() - start:.1f} s)")
+
+
+if __name__ == '__main__':
+    main()
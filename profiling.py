@@ -0,0 +1,102 @@
+# profiling.py
+
+import datetime
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+# --- Configuration ---
+# Se activa con ?profile=1 en la URL o con la variable de entorno DASHBOARD_PROFILE=1
+PROFILE_ENV_VAR = 'DASHBOARD_PROFILE'
+PROFILE_LOG_ENV_VAR = 'DASHBOARD_PROFILE_LOG'
+DEFAULT_LOG_FILE = os.path.join('logs', 'rerun_profile.jsonl')
+
+# --- Cache Counters ---
+# Los cuerpos de las funciones con @st.cache_data solo se ejecutan en un fallo de caché,
+# así que basta con contar cuántas veces se ejecutan para separar aciertos de fallos.
+_cache_misses = Counter()
+_cache_calls = Counter()
+_lock = threading.Lock()
+
+
+def count_cache_miss(name):
+    with _lock:
+        _cache_misses[name] += 1
+
+
+def cache_totals():
+    with _lock:
+        return {
+            name: {'calls': _cache_calls[name], 'misses': _cache_misses[name], 'hits': _cache_calls[name] - _cache_misses[name]}
+            for name in _cache_calls
+        }
+
+
+def env_enabled():
+    return os.environ.get(PROFILE_ENV_VAR, '').lower() in ('1', 'true', 'yes')
+
+
+class RerunProfiler:
+    """
+    Times consecutive sections of one script rerun. Each lap(name) closes the section
+    that started at the previous lap. When disabled every method is a no-op.
+    """
+    def __init__(self, enabled, context=None):
+        self.enabled = enabled
+        self.sections = {}
+        self.cache_events = {}
+        self.context = dict(context or {})
+        self.recorded = False
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.sections[name] = self.sections.get(name, 0.0) + (now - self._last)
+        self._last = now
+
+    def cached_call(self, name, fn, *args, **kwargs):
+        """
+        Calls a cached function and records whether it was a cache hit or a miss.
+        The function body must call count_cache_miss(name).
+        """
+        with _lock:
+            misses_before = _cache_misses[name]
+            _cache_calls[name] += 1
+        result = fn(*args, **kwargs)
+        if self.enabled:
+            with _lock:
+                self.cache_events[name] = 'miss' if _cache_misses[name] > misses_before else 'hit'
+        return result
+
+    def total(self):
+        return time.perf_counter() - self._start
+
+    def record(self):
+        """
+        Summary of this rerun (milliseconds), also used for the log line.
+        """
+        self.recorded = True
+        return {
+            'timestamp': datetime.datetime.now().isoformat(timespec='milliseconds'),
+            'total_ms': round(self.total() * 1000, 2),
+            'sections_ms': {name: round(seconds * 1000, 2) for name, seconds in self.sections.items()},
+            'cache': self.cache_events,
+            'cache_totals': cache_totals(),
+            **self.context,
+        }
+
+    def append_log(self, record, log_file=None):
+        """
+        Appends the record as one JSON line to the structured profile log.
+        """
+        log_file = log_file or os.environ.get(PROFILE_LOG_ENV_VAR, DEFAULT_LOG_FILE)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+            with _lock, open(log_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        except OSError:
+            pass  # El perfil nunca debe tumbar el dashboard
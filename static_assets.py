@@ -0,0 +1,85 @@
+# static_assets.py
+
+import base64
+import os
+
+try:
+    from PIL import Image
+except ImportError:  # Sin Pillow no se generan variantes y se usa el data URI
+    Image = None
+
+# --- Static Serving ---
+# Streamlit sirve la carpeta ./static (junto a dashboard.py) en 'app/static/'
+# cuando server.enableStaticServing = true (ver .streamlit/config.toml).
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+STATIC_URL = 'app/static'
+
+# Anchos de las variantes: 'mobile' corresponde al breakpoint @media (max-width: 768px)
+VARIANT_WIDTHS = {'desktop': 1920, 'mobile': 768}
+VARIANT_FORMATS = {'webp': dict(format='WEBP', quality=80, method=6), 'jpg': dict(format='JPEG', quality=82, optimize=True, progressive=True)}
+
+
+def _variant_name(image_file, variant, ext):
+    stem = os.path.splitext(os.path.basename(image_file))[0]
+    return f"{stem}-{variant}.{ext}"
+
+
+def build_image_variants(image_file, static_dir=STATIC_DIR, static_url=STATIC_URL):
+    """
+    Writes downscaled WebP/JPEG variants of an image into the static folder and
+    returns their URLs (under 'static_url') as {variant: {ext: url}}. Variants newer
+    than the source are reused.
+    Returns None when the variants can't be produced (no Pillow, read-only folder, ...).
+    """
+    if Image is None:
+        return None
+
+    source_mtime = os.path.getmtime(image_file)
+    urls = {}
+    try:
+        os.makedirs(static_dir, exist_ok=True)
+        with Image.open(image_file) as img:
+            # JPEG no admite transparencia: el fondo se aplana sobre negro
+            img = img.convert('RGB')
+            for variant, max_width in VARIANT_WIDTHS.items():
+                urls[variant] = {}
+                for ext, save_kwargs in VARIANT_FORMATS.items():
+                    name = _variant_name(image_file, variant, ext)
+                    target = os.path.join(static_dir, name)
+                    if not os.path.exists(target) or os.path.getmtime(target) < source_mtime:
+                        resized = img
+                        if img.width > max_width:
+                            height = round(img.height * max_width / img.width)
+                            resized = img.resize((max_width, height), Image.LANCZOS)
+                        resized.save(target, **save_kwargs)
+                    urls[variant][ext] = f"{static_url}/{name}"
+    except OSError:
+        return None
+    return urls
+
+
+def encode_data_uri(image_file):
+    """
+    Base64 data URI of an image, used when static serving is not available.
+    """
+    with open(image_file, "rb") as f:
+        encoded_img = base64.b64encode(f.read()).decode()
+    return f"data:image/png;base64,{encoded_img}"
+
+
+def background_css(urls):
+    """
+    CSS for the .stApp background: desktop variant by default and the mobile one
+    under the 768px breakpoint, WebP with a JPEG fallback.
+    """
+    def rule(variant):
+        webp, jpg = urls[variant]['webp'], urls[variant]['jpg']
+        return (
+            f'background-image: url("{jpg}");\n'
+            f'background-image: image-set(url("{webp}") type("image/webp"), url("{jpg}") type("image/jpeg"));'
+        )
+
+    return (
+        f".stApp {{\n{rule('desktop')}\n}}\n"
+        f"@media (max-width: 768px) {{\n.stApp {{\n{rule('mobile')}\n}}\n}}"
+    )